@@ -0,0 +1,205 @@
+"""Stress test for the on-disk section cache: N processes building packs at once.
+
+Builds a small project in a temp dir, then, for each cache backend, starts N
+fresh processes that build packs in a loop for --seconds while one more
+process keeps rewriting docs/NOW.md (atomically, with a new version each
+time). It checks:
+
+- correctness: every pack must be byte-identical to the uncached pack for one
+  of the NOW.md versions written;
+- staleness: once the writer stops, every process's next pack must reflect
+  the final version;
+- integrity: for the sqlite backend, PRAGMA integrity_check must pass;
+
+and reports throughput (packs/s over all processes), and each backend's
+speedup over the no-cache run.
+
+    python benchmarks/cache_stress.py --processes 16 --seconds 5
+    python benchmarks/cache_stress.py --backend sqlite --processes 32 --output stress.json
+
+Exits 1 if any check fails.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from handoffkit.__main__ import build_context_pack, configure_disk_cache  # noqa: E402
+
+BACKENDS = ["none", "files", "sqlite"]
+VERSIONS = 50
+INSTRUCTION = "Stress the shared cache"
+
+NOTES_ENTRY = """## Session {i}
+
+- Branch: feature/session-{i}
+- Summary of work: Refactored the context builder and updated docs/NOW.md.
+- Decisions made: Keep the heuristic tokenizer as the default.
+
+"""
+
+def now_text(version: int) -> str:
+    # The padding varies the size too, so (size, mtime) changes even on coarse-mtime filesystems.
+    queued = "- queued item\n" * (version % 7)
+    return (f"# NOW\n\n<!-- SUMMARY_START -->\nCurrent focus: version {version}.\n"
+            f"{queued}<!-- SUMMARY_END -->\n\nDetails for version {version}.\n")
+
+def make_project(root: Path) -> None:
+    docs = root / "docs"
+    docs.mkdir(parents=True)
+    (docs / "PROJECT_CONTEXT.md").write_text(
+        "# Project context\n\n" + "The kit builds role handoff packs from project docs.\n" * 400, encoding="utf-8")
+    (docs / "NOW.md").write_text(now_text(0), encoding="utf-8")
+    (docs / "SESSION_NOTES.md").write_text("".join(NOTES_ENTRY.format(i=i) for i in range(2000)), encoding="utf-8")
+    (docs / "AGENT_SESSION_PROTOCOL.md").write_text("# Protocol\n\n" + "- Follow the steps.\n" * 300,
+                                                     encoding="utf-8")
+
+def project_config(backend: str) -> Dict:
+    return {
+        "token_budget": 2200,
+        "baseline_files": ["docs/PROJECT_CONTEXT.md", "docs/NOW.md"],
+        "session_notes_file": "docs/SESSION_NOTES.md",
+        "session_notes_tail_lines": 80,
+        "protocol_file": "docs/AGENT_SESSION_PROTOCOL.md",
+        "protocol_tail_lines": 120,
+        "cache_enabled": backend != "none",
+        "cache_backend": backend if backend != "none" else "files",
+    }
+
+def build(root: Path, cfg: Dict) -> str:
+    return build_context_pack(root, cfg, INSTRUCTION, None, None, role_name="coder", role_agent_path=None)
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def write_now(root: Path, version: int) -> None:
+    path = root / "docs" / "NOW.md"
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(now_text(version), encoding="utf-8")
+    os.replace(tmp, path)
+
+def reader(root: str, backend: str, expected: Dict[str, int], start, stop_writes, done, out) -> None:
+    project = Path(root)
+    cfg = project_config(backend)
+    configure_disk_cache(project, cfg)
+    packs = errors = 0
+    bad: List[str] = []
+    start.wait()
+    started = time.perf_counter()
+    while not stop_writes.is_set():
+        try:
+            text = build(project, cfg)
+        except Exception as e:  # any failure under contention is a finding
+            errors += 1
+            bad.append(f"{type(e).__name__}: {e}")
+            continue
+        packs += 1
+        if digest(text) not in expected:
+            errors += 1
+            bad.append(text[:200])
+    elapsed = time.perf_counter() - started
+    done.wait()
+    final = expected.get(digest(build(project, cfg)))
+    out.put({"pid": os.getpid(), "packs": packs, "errors": errors, "samples": bad[:3],
+             "elapsed": elapsed, "final_version": final})
+
+def writer(root: str, seconds: float, start, stop_writes, done, out) -> None:
+    project = Path(root)
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    version = 0
+    while time.perf_counter() < deadline:
+        time.sleep(seconds / VERSIONS)
+        version = version % (VERSIONS - 1) + 1
+        write_now(project, version)
+    stop_writes.set()
+    out.put({"writer": True, "final_version": version})
+    done.set()
+
+def run_backend(base: Path, backend: str, processes: int, seconds: float, log) -> Dict:
+    root = base / backend
+    make_project(root)
+    # Expected packs per NOW.md version, built without any cache.
+    cfg = project_config("none")
+    expected: Dict[str, int] = {}
+    for version in range(VERSIONS):
+        write_now(root, version)
+        expected[digest(build(root, cfg))] = version
+    write_now(root, 0)
+
+    ctx = mp.get_context("spawn")
+    start = ctx.Barrier(processes + 2)
+    stop_writes, done = ctx.Event(), ctx.Event()
+    out = ctx.Queue()
+    procs = [ctx.Process(target=reader, args=(str(root), backend, expected, start, stop_writes, done, out))
+             for _ in range(processes)]
+    procs.append(ctx.Process(target=writer, args=(str(root), seconds, start, stop_writes, done, out)))
+    for p in procs:
+        p.start()
+    start.wait()
+    results = [out.get(timeout=seconds + 120) for _ in procs]
+    for p in procs:
+        p.join()
+
+    final = next(r["final_version"] for r in results if r.get("writer"))
+    readers = [r for r in results if not r.get("writer")]
+    packs = sum(r["packs"] for r in readers)
+    wall = max(r["elapsed"] for r in readers)
+    report = {
+        "backend": backend,
+        "processes": processes,
+        "packs": packs,
+        "packs_per_s": round(packs / wall, 1) if wall else 0.0,
+        "errors": sum(r["errors"] for r in readers),
+        "stale_after_writes": sum(1 for r in readers if r["final_version"] != final),
+        "samples": [s for r in readers for s in r["samples"]][:5],
+        "exit_codes": sorted({p.exitcode for p in procs}),
+    }
+    if backend == "sqlite":
+        import sqlite3
+        with sqlite3.connect(str(root / ".handoffkit" / "cache.sqlite3")) as conn:
+            report["integrity"] = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    report["ok"] = (report["errors"] == 0 and report["stale_after_writes"] == 0 and report["exit_codes"] == [0]
+                    and report.get("integrity", "ok") == "ok")
+    log(f"{backend:<7} {processes:>3} procs  {report['packs']:>7} packs  {report['packs_per_s']:>9} packs/s  "
+        f"errors {report['errors']}  stale {report['stale_after_writes']}  "
+        f"{'ok' if report['ok'] else 'FAILED'}")
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Run N concurrent pack builders against the on-disk cache")
+    ap.add_argument("--processes", type=int, default=max(4, os.cpu_count() or 1), help="Concurrent reader processes")
+    ap.add_argument("--seconds", type=float, default=5.0, help="How long the readers and the writer run")
+    ap.add_argument("--backend", choices=BACKENDS + ["all"], default="all", help="Cache backend to test")
+    ap.add_argument("--output", default=None, help="Write results JSON here")
+    ap.add_argument("--workdir", default=None, help="Where to generate the projects (default: a temp dir)")
+    args = ap.parse_args(argv)
+
+    def log(line: str) -> None:
+        print(line, file=sys.stderr, flush=True)
+
+    backends = BACKENDS if args.backend == "all" else [args.backend]
+    with tempfile.TemporaryDirectory(prefix="handoffkit-stress-", dir=args.workdir) as tmp:
+        reports = [run_backend(Path(tmp), b, args.processes, args.seconds, log) for b in backends]
+
+    uncached = next((r["packs_per_s"] for r in reports if r["backend"] == "none"), None)
+    if uncached:
+        for r in reports:
+            r["speedup_vs_none"] = round(r["packs_per_s"] / uncached, 2)
+        log("speedup vs no cache: " + "  ".join(f"{r['backend']} x{r['speedup_vs_none']}" for r in reports))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2) + "\n", encoding="utf-8")
+    return 0 if all(r["ok"] for r in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""Latency and peak-memory benchmarks for the pack builder and its helpers.
+
+Generates synthetic projects of increasing size in a temp dir (session notes
+from 1 KB to 100 MB, diffs from 10 to 100k hunks, long backtick runs) and
+measures build_context_pack, fenced_block, tail_lines, read_optional_input and
+read_diff_input end to end. Latency is the best of a few timeit repeats; peak
+memory is tracemalloc's peak over a separate run (Python allocations only, so
+mmap'd reads do not count).
+
+    python benchmarks/pack_builder.py --output before.json
+    python benchmarks/pack_builder.py --output after.json --compare before.json
+
+--quick stops at 1 MB notes and 1k hunks for a fast smoke run.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from handoffkit.__main__ import (build_context_pack, fenced_block, read_diff_input,  # noqa: E402
+                                 read_optional_input, tail_lines)
+
+NOTES_SIZES = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 100 << 20]
+HUNK_COUNTS = [10, 100, 1_000, 10_000, 100_000]
+TICK_RUNS = [3, 100, 10_000, 1_000_000]
+QUICK_NOTES_MAX = 1 << 20
+QUICK_HUNKS_MAX = 1_000
+# Keep each measurement to roughly this long, but always run at least once.
+TARGET_SECONDS = 0.2
+REPEATS = 3
+
+NOTES_ENTRY = """## Session {i}
+
+- Participants: Coder, Reviewer
+- Branch: feature/session-{i}
+- Summary of work: Refactored the context builder and updated docs/NOW.md.
+- Files touched: handoffkit/__main__.py, docs/SESSION_NOTES.md
+- Decisions made: Keep the heuristic tokenizer as the default.
+
+"""
+
+def write_notes(path: Path, size: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        written = i = 0
+        while written < size:
+            entry = NOTES_ENTRY.format(i=i)
+            f.write(entry)
+            written += len(entry)
+            i += 1
+
+def write_diff(path: Path, hunks: int, hunks_per_file: int = 10) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for h in range(hunks):
+            if h % hunks_per_file == 0:
+                name = f"src/module_{h // hunks_per_file}.py"
+                f.write(f"diff --git a/{name} b/{name}\n--- a/{name}\n+++ b/{name}\n")
+            line = (h % hunks_per_file) * 20 + 1
+            f.write(f"@@ -{line},3 +{line},4 @@ def handler_{h}():\n"
+                    f"     value = compute({h})\n"
+                    f"-    return value\n"
+                    f"+    checked = validate(value)\n"
+                    f"+    return checked\n"
+                    f"     # end of handler {h}\n")
+
+def tick_text(run: int) -> str:
+    body = "Inline `code` and ``double`` spans, then a fence:\n```python\nprint('hi')\n```\n" * 200
+    return body + "`" * run + "\n" + body
+
+def make_project(root: Path, notes_size: int) -> Path:
+    docs = root / "docs"
+    docs.mkdir(parents=True, exist_ok=True)
+    (docs / "PROJECT_CONTEXT.md").write_text("# Project\n\n" + "Context paragraph.\n" * 200, encoding="utf-8")
+    (docs / "NOW.md").write_text("# Now\n\n" + "- Next task\n" * 100, encoding="utf-8")
+    (docs / "AGENT_SESSION_PROTOCOL.md").write_text("# Protocol\n\n" + "1. Step\n" * 300, encoding="utf-8")
+    write_notes(docs / "SESSION_NOTES.md", notes_size)
+    return root
+
+def default_config() -> Dict:
+    return json.loads((REPO_ROOT / "handoffkit" / "handoffkit.config.json").read_text(encoding="utf-8"))
+
+def measure(fn: Callable[[], object]) -> Dict:
+    timer = timeit.Timer(fn)
+    first = timer.timeit(1)
+    number = max(1, int(TARGET_SECONDS / first)) if first > 0 else 1000
+    best = min([first] + [t / number for t in timer.repeat(REPEATS - 1, number)]) if first < TARGET_SECONDS else first
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+def run_suite(workdir: Path, quick: bool, log: Callable[[str], None]) -> List[Dict]:
+    cfg = default_config()
+    results: List[Dict] = []
+
+    def record(name: str, params: Dict, fn: Callable[[], object]) -> None:
+        result = {"name": name, "params": params, **measure(fn)}
+        results.append(result)
+        log(f"{name:<22} {json.dumps(params):<28} {result['seconds'] * 1000:10.3f} ms"
+            f" {result['peak_bytes'] / 1024:12.1f} KiB")
+
+    for size in NOTES_SIZES:
+        if quick and size > QUICK_NOTES_MAX:
+            break
+        project = make_project(workdir / f"notes-{size}", size)
+        notes = (project / "docs" / "SESSION_NOTES.md").read_text(encoding="utf-8")
+        record("build_context_pack", {"notes_bytes": size},
+               lambda: build_context_pack(project, cfg, "Benchmark", None, None,
+                                          role_name="coder", role_agent_path=None))
+        record("tail_lines", {"notes_bytes": size}, lambda notes=notes: tail_lines(notes, 80))
+        record("read_optional_input", {"notes_bytes": size},
+               lambda: read_optional_input("docs/SESSION_NOTES.md", project_root=project, label="Selection",
+                                           max_chars=int(cfg.get("token_budget", 2200)) * 8))
+        del notes
+
+    project = make_project(workdir / "diffs", 10 << 10)
+    for hunks in HUNK_COUNTS:
+        if quick and hunks > QUICK_HUNKS_MAX:
+            break
+        diff_path = workdir / f"{hunks}.diff"
+        write_diff(diff_path, hunks)
+        record("read_diff_input", {"hunks": hunks},
+               lambda: read_diff_input(str(diff_path), project_root=project, cfg=cfg))
+        record("build_context_pack", {"hunks": hunks},
+               lambda: build_context_pack(project, cfg, "Benchmark", None,
+                                          read_diff_input(str(diff_path), project_root=project, cfg=cfg),
+                                          role_name="coder", role_agent_path=None))
+
+    for run in TICK_RUNS:
+        text = tick_text(run)
+        record("fenced_block", {"tick_run": run}, lambda: fenced_block(text, "Selection"))
+    return results
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+def compare(results: List[Dict], baseline: Dict) -> None:
+    before = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline.get("results", [])}
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'} (new/old):", file=sys.stderr)
+    for r in results:
+        old = before.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if old is None:
+            continue
+        time_ratio = r["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        mem_ratio = r["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else float("inf")
+        print(f"{r['name']:<22} {json.dumps(r['params']):<28} time x{time_ratio:6.2f}  peak x{mem_ratio:6.2f}",
+              file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark build_context_pack and its helpers")
+    ap.add_argument("--output", default=None, help="Write results JSON here (default: stdout)")
+    ap.add_argument("--compare", default=None, help="Earlier results JSON to print time/memory ratios against")
+    ap.add_argument("--quick", action="store_true", help="Skip the 10 MB+ notes and 10k+ hunk cases")
+    ap.add_argument("--workdir", default=None, help="Where to generate the synthetic trees (default: a temp dir)")
+    args = ap.parse_args(argv)
+
+    def log(line: str) -> None:
+        print(line, file=sys.stderr, flush=True)
+
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = run_suite(workdir, args.quick, log)
+    else:
+        with tempfile.TemporaryDirectory(prefix="handoffkit-bench-") as tmp:
+            results = run_suite(Path(tmp), args.quick, log)
+
+    report = {"commit": git_commit(), "python": platform.python_version(), "quick": args.quick, "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Startup benchmark for the handoffkit CLI.
+
+Runs each subcommand in a fresh interpreter: once under `python -X importtime`
+to record which modules it imports and their total self time, then --runs
+more times for wall-clock time. Compare against a saved baseline to catch
+regressions, e.g. a module-level import that every subcommand now pays for:
+
+    python benchmarks/startup.py --save-baseline benchmarks/startup-baseline.json
+    python benchmarks/startup.py --baseline benchmarks/startup-baseline.json
+
+Exits 1 if a subcommand imports a module the baseline did not, or if import
+or wall time grows by more than --tolerance. Module sets are only compared
+when the baseline was recorded with the same Python version.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def scenarios(root: str) -> Dict[str, List[str]]:
+    return {
+        "role": ["role", "coder", "startup benchmark", "--root", root, "--no-daemon"],
+        "session start": ["session", "start", "--root", root],
+        "session end": ["session", "end", "--root", root],
+    }
+
+def parse_importtime(stderr: str) -> Tuple[int, List[str]]:
+    """(total self time in microseconds, imported module names) from -X importtime output."""
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        total += int(fields[0])
+        modules.append(fields[2].strip())
+    return total, sorted(set(modules))
+
+def run_scenario(command: List[str], args: List[str], env: Dict[str, str], runs: int) -> Dict:
+    # Warm-up run: fills __pycache__ and the startup index, like a real second invocation.
+    subprocess.run(command + args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+    traced = subprocess.run([sys.executable, "-X", "importtime", "-m", "handoffkit"] + args, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True)
+    import_us, modules = parse_importtime(traced.stderr)
+    walls = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command + args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+        walls.append(time.perf_counter() - started)
+    return {
+        "import_us": import_us,
+        "wall_ms_median": round(statistics.median(walls) * 1000, 2),
+        "wall_ms_min": round(min(walls) * 1000, 2),
+        "modules": modules,
+    }
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    problems = []
+    same_python = current["python"] == baseline.get("python")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if same_python:
+            added = sorted(set(result["modules"]) - set(base["modules"]))
+            if added:
+                problems.append(f"{name}: new imports {', '.join(added)}")
+        for metric in ("import_us", "wall_ms_median"):
+            if result[metric] > base[metric] * (1 + tolerance):
+                problems.append(f"{name}: {metric} {result[metric]} > baseline {base[metric]} (+{tolerance:.0%})")
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Measure handoffkit CLI startup per subcommand")
+    ap.add_argument("--root", default=str(REPO_ROOT), help="Project root the subcommands run against")
+    ap.add_argument("--runs", type=int, default=15, help="Timed runs per subcommand")
+    ap.add_argument("--launcher", default=None, help="Time this launcher (see `python -m handoffkit.launcher`) instead of `python -m handoffkit`")
+    ap.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    ap.add_argument("--save-baseline", default=None, help="Write the results to this file as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative growth in import/wall time")
+    ap.add_argument("--output", default=None, help="Write results JSON here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    command = [args.launcher] if args.launcher else [sys.executable, "-m", "handoffkit"]
+    results = {
+        "python": platform.python_version(),
+        "command": command,
+        "scenarios": {name: run_scenario(command, sub, env, args.runs) for name, sub in scenarios(args.root).items()},
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    for name, result in results["scenarios"].items():
+        print(f"{name:<14} imports {result['import_us'] / 1000:6.1f} ms ({len(result['modules'])} modules)"
+              f"  wall {result['wall_ms_median']:6.1f} ms", file=sys.stderr)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + "\n", encoding="utf-8")
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
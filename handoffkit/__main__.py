@@ -1,45 +1,130 @@
-import argparse, json, sys
-import shutil
-import subprocess
-from datetime import datetime
+# Startup time matters here (editor hooks run this per keystroke-ish action), so
+# only what every subcommand needs is imported at module level; subprocess,
+# shutil, datetime and the pack-building modules are imported where used.
+# Annotations are postponed, so defining this module's functions does not
+# evaluate a typing subscript per signature.
+from __future__ import annotations
+
+import argparse, json, os, sys
+from time import perf_counter
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, List, Tuple, Optional, Dict, TextIO, TypeVar, Union
+
+from .stats import PackStats, collecting, current as current_stats, emit as emit_stats, record_read, record_stage
+
+if TYPE_CHECKING:
+    from .diffstage import DiffSummary
+    from .render import Pack
+    from .prompts import RolePrompt
+    from .tokenizer import Tokenizer
+
+T = TypeVar("T")
+
+# Set by `handoffkit serve`: a WarmCache that memoizes config, role prompts and
+# materialized sections for the lifetime of the daemon process.
+_warm_cache = None
+
+def memoized(key, paths: List[Path], compute: Callable[[], T]) -> T:
+    """Return compute(), reusing the daemon's warm cache when one is active."""
+    if _warm_cache is None:
+        return compute()
+    return _warm_cache.get(key, paths, compute)
+
+# Set by configure_disk_cache: a DiskCache (or, with "cache_backend": "sqlite",
+# a SQLiteCache) persisting materialized sections under <project_root>/.handoffkit
+# between invocations. Both beat building uncached in benchmarks/cache_stress.py,
+# sqlite by more when many processes share a project; "files" stays the default.
+_disk_cache = None
+
+def configure_disk_cache(project_root: Path, cfg: Dict) -> None:
+    global _disk_cache
+    if not cfg.get("cache_enabled", True):
+        _disk_cache = None
+        return
+    _disk_cache = open_disk_cache(project_root, cfg)
+
+def open_disk_cache(project_root: Path, cfg: Dict):
+    from .cache import DEFAULT_MAX_BYTES, DiskCache
+
+    max_bytes = int(cfg.get("cache_max_bytes", DEFAULT_MAX_BYTES))
+    backend = cfg.get("cache_backend", "files")
+    if backend == "sqlite":
+        from .sqlcache import SQLiteCache
+        return SQLiteCache.for_project(project_root, max_bytes)
+    if backend != "files":
+        raise ValueError(f"Unknown cache_backend: {backend!r} (choose from files, sqlite)")
+    return DiskCache.for_project(project_root, max_bytes)
+
+# Set by configure_section_store (`role --incremental` / `--watch`): a
+# SectionStore reusing the previous pack's section counts and trims.
+_section_store = None
+
+def configure_section_store(project_root: Path) -> None:
+    global _section_store
+    from .incremental import SectionStore
+    _section_store = SectionStore.for_project(project_root)
+
+def derived_from_file(p: Path, params, derive: Callable[[str], T]) -> Optional[T]:
+    """derive(text of p), served from the disk cache when enabled; None if p is missing.
 
-def approx_tokens(text: str) -> int:
-    # Extremely rough heuristic: ~4 chars/token typical for English.
-    return max(1, len(text) // 4)
+    Values must be JSON-serializable so they can be persisted.
+    """
+    if _disk_cache is None:
+        if not p.exists():
+            return None
+        return derive(read_text(p))
+
+    def derive_bytes(data: bytes) -> T:
+        # Only a cache miss needs textio (and the docscan it pulls in).
+        from .textio import decode_text
+
+        return derive(decode_text(data))
+
+    return _disk_cache.get(p, params, derive_bytes)
+
+def derived_from_stat(p: Path, params, derive: Callable[[Path], T]) -> Optional[T]:
+    """Like derived_from_file, but derive() streams from the path itself.
+
+    The disk cache validates these entries by size and mtime only, so an
+    append-only file is never read in full just to be hashed.
+    """
+    if _disk_cache is None:
+        if not p.exists():
+            return None
+        return derive(p)
+    return _disk_cache.get_by_stat(p, params, derive)
 
 def read_text(p: Path) -> str:
-    try:
-        return p.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-        return p.read_text(encoding="utf-8", errors="replace")
+    from .textio import decode_text
+
+    data = p.read_bytes()
+    record_read(p, len(data))
+    return decode_text(data)
 
 def strip_frontmatter(md: str) -> str:
-    # Strips simple YAML frontmatter if present: --- ... --- at the top.
-    if md.startswith("---"):
-        parts = md.split("---", 2)
-        if len(parts) >= 3:
-            return parts[2].lstrip("\n")
-    return md
+    # Strips YAML frontmatter if present: a --- line ... a --- line at the top.
+    from .docscan import scan
+
+    return scan(md).body().lstrip("\n")
 
 def max_run_of_char(text: str, ch: str) -> int:
-    max_run = 0
-    run = 0
-    for c in text:
-        if c == ch:
-            run += 1
-            if run > max_run:
-                max_run = run
-        else:
-            run = 0
-    return max_run
+    from .docscan import longest_run
+
+    return longest_run(text, ch)
+
+def fenced_block(text: str, label: str, *, longest_tick_run: Optional[int] = None) -> str:
+    """Markdown section with `text` in a fence longer than any backtick run inside it.
 
-def fenced_block(text: str, label: str) -> str:
+    Pass `longest_tick_run` when it is already known (e.g. from read_capped).
+    """
     content = text.strip()
     if not content:
         return ""
-    fence_len = max(3, max_run_of_char(content, "`") + 1)
+    if longest_tick_run is None:
+        from .docscan import scan
+        longest_tick_run = scan(content).longest_tick_run
+    fence_len = max(3, longest_tick_run + 1)
     fence = "`" * fence_len
     return f"## {label}\n\n{fence}\n{content}\n{fence}"
 
@@ -54,44 +139,145 @@ def find_project_root(start: Path) -> Path:
             return p
     return start
 
+# The persistent StartupIndex (root/config index), created on first use.
+_startup_index = None
+
+def startup_index():
+    global _startup_index
+    if _startup_index is None:
+        from .rootindex import StartupIndex
+        _startup_index = StartupIndex()
+    return _startup_index
+
+def discover_project_root(root_arg: Optional[str]) -> Path:
+    """find_project_root for a --root argument.
+
+    Without --root, $HANDOFFKIT_ROOT wins and the cwd is looked up in the
+    startup index. An explicit --root is always honoured as given; it usually
+    is the root already, so the walk stops at its first directory.
+    """
+    if root_arg is not None:
+        return find_project_root(Path(root_arg))
+    from .rootindex import ROOT_ENV
+
+    override = os.environ.get(ROOT_ENV)
+    if override:
+        return Path(os.path.abspath(override))
+    # abspath, unlike resolve(), does not stat every component.
+    start = os.path.abspath(".")
+    index = startup_index()
+    root = index.lookup_root(start)
+    if root is not None:
+        return root
+    root = find_project_root(Path(start))
+    marker = next((m for m in (root / "docs" / "PROJECT_CONTEXT.md", root / ".git") if m.exists()), None)
+    index.record_root(start, root, marker)
+    index.save()
+    return root
+
 def extract_summary_block(text: str) -> Optional[str]:
-    s = text.find("<!-- SUMMARY_START -->")
-    e = text.find("<!-- SUMMARY_END -->")
-    if s != -1 and e != -1 and e > s:
-        return text[s + len("<!-- SUMMARY_START -->"):e].strip()
-    return None
+    from .docscan import scan
+
+    return scan(text).summary_text()
 
 def tail_lines(text: str, max_lines: int) -> str:
-    lines = text.splitlines()
-    if len(lines) <= max_lines:
-        return text.strip()
-    return "\n".join(lines[-max_lines:]).strip()
+    from .docscan import scan
+
+    return scan(text).tail(max_lines)
+
+ROOT_HELP = ("Path to (or inside) your project root. Can be run from anywhere "
+             "(default: $HANDOFFKIT_ROOT, else the current directory).")
 
 ROLE_CHOICES = ["architect", "coder", "reviewer", "qa_tester", "polish", "qa"]
 SESSION_ROLE_CHOICES = ["Architect", "Coder", "Reviewer", "QA"]
 
-def read_optional_input(path_str: Optional[str], *, project_root: Path, label: str) -> Optional[str]:
+# Selection/Diff can never use more than the whole budget. Allow generous
+# chars-per-token headroom for dense tokenizers; the allocator trims the rest.
+INPUT_CHARS_PER_TOKEN = 8
+
+def input_char_cap(cfg: Dict) -> int:
+    return int(cfg.get("input_max_chars") or int(cfg.get("token_budget", 2200)) * INPUT_CHARS_PER_TOKEN)
+
+def read_optional_input(path_str: Optional[str], *, project_root: Path, label: str,
+                        max_chars: Optional[int] = None) -> Optional[str]:
     """Read optional content from a file path or stdin.
 
     Supports:
       --diff /path/to/file.diff
       --diff -    (read from stdin)
     Paths are resolved relative to project_root if not absolute.
+    Input is streamed in chunks and buffering stops after `max_chars`.
     """
     if not path_str:
         return None
+    p = _input_path(path_str, project_root, label)
+    if p is None:
+        return _fenced_stream(sys.stdin, label, max_chars)
+    with open(p, encoding="utf-8", errors="replace") as f:
+        content = _fenced_stream(f, label, max_chars)
+        record_read(p, f.buffer.tell())
+    return content
+
+def _input_path(path_str: str, project_root: Path, label: str) -> Optional[Path]:
+    """Resolved input file, or None for '-' (stdin)."""
     if path_str == "-":
-        data = sys.stdin.read()
-        return fenced_block(data, label) or None
+        return None
     p = Path(path_str)
     if not p.is_absolute():
         p = (project_root / p).resolve()
     if not p.exists():
         raise FileNotFoundError(f"{label} file not found: {p}")
-    content = read_text(p).strip()
-    if not content:
+    return p
+
+def _fenced_stream(stream, label: str, max_chars: Optional[int]) -> Optional[str]:
+    from .budget import TRUNCATION_MARK
+    from .textio import read_capped
+
+    content, longest_tick_run, truncated = read_capped(stream, max_chars)
+    if truncated:
+        content += TRUNCATION_MARK
+    return fenced_block(content, label, longest_tick_run=longest_tick_run) or None
+
+def read_diff_input(path_str: Optional[str], *, project_root: Path, cfg: Dict,
+                    selection: Optional[str] = None) -> Optional["DiffSummary"]:
+    """Parse a diff file (or '-' for stdin) into a DiffSummary of ranked hunks.
+
+    The selection content, when given, boosts hunks that overlap it.
+    """
+    if not path_str:
+        return None
+    p = _input_path(path_str, project_root, "Diff")
+    if p is None:
+        return summarize_diff_stream(sys.stdin, cfg, selection)
+    with open(p, encoding="utf-8", errors="replace") as f:
+        summary = summarize_diff_stream(f, cfg, selection)
+        record_read(p, f.buffer.tell())
+    return summary
+
+def summarize_diff_stream(stream, cfg: Dict, selection: Optional[str]) -> Optional["DiffSummary"]:
+    from .diffstage import DEFAULT_EXCLUDE, summarize_diff
+
+    summary = summarize_diff(stream, selection=selection, max_chars=input_char_cap(cfg),
+                             exclude=cfg.get("diff_exclude", DEFAULT_EXCLUDE))
+    if not summary.is_diff and not summary.preamble.strip():
         return None
-    return fenced_block(content, label)
+    return summary
+
+def diff_section(summary: "DiffSummary", max_tokens: Optional[int], tokenizer: "Tokenizer") -> str:
+    """Fenced Diff section holding the most relevant hunks that fit in max_tokens."""
+    from .budget import trim_to_boundary
+
+    if max_tokens is None:
+        return fenced_block(summary.render(None, tokenizer), "Diff")
+    inner = max_tokens - tokenizer.count(fenced_block("-", "Diff"))
+    # Per-part counts miss the joining newlines; shrink and re-render if that overshoots.
+    for attempt in range(1, 4):
+        content = fenced_block(summary.render(max(0, inner), tokenizer), "Diff")
+        over = tokenizer.count(content) - max_tokens
+        if over <= 0:
+            return content
+        inner -= over * attempt
+    return trim_to_boundary(content, max_tokens, tokenizer)
 
 def load_config(project_root: Path, tool_root: Path, config_path: Optional[str]) -> Dict:
     """Load config.
@@ -112,6 +298,19 @@ def load_config(project_root: Path, tool_root: Path, config_path: Optional[str])
         candidates.append(project_root / "handoffkit.config.json")
         candidates.append(tool_root / "handoffkit.config.json")
 
+    return memoized(("config", tuple(candidates)), candidates, lambda: _load_config_indexed(candidates))
+
+def _load_config_indexed(candidates: List[Path]) -> Dict:
+    index = startup_index()
+    found, cfg = index.lookup_config(candidates)
+    if found:
+        return cfg
+    cfg = _load_config_from(candidates)
+    index.record_config(candidates, cfg)
+    index.save()
+    return cfg
+
+def _load_config_from(candidates: List[Path]) -> Dict:
     cfg_path = next((p for p in candidates if p.exists()), None)
     if cfg_path:
         try:
@@ -132,8 +331,11 @@ def load_config(project_root: Path, tool_root: Path, config_path: Optional[str])
         "protocol_tail_lines": 120,
     }
 
-def load_role_prompt(project_root: Path, tool_root: Path, role: str) -> Tuple[str, Optional[Path]]:
-    """Load role prompt from repo agents if present, else from kit templates."""
+def load_role_prompt(project_root: Path, tool_root: Path, role: str,
+                     tokenizer: Optional["Tokenizer"] = None) -> Tuple["RolePrompt", Optional[Path]]:
+    """Compiled role prompt from repo agents if present, else from kit templates (see prompts.py)."""
+    from .tokenizer import HeuristicTokenizer
+
     role = role.lower()
     repo_slug_map = {
         "architect": "architect",
@@ -145,9 +347,19 @@ def load_role_prompt(project_root: Path, tool_root: Path, role: str) -> Tuple[st
     }
     slug = repo_slug_map.get(role, role)
     repo_agent_path = project_root / ".github" / "agents" / f"{slug}.agent.md"
-    if repo_agent_path.exists():
-        content = strip_frontmatter(read_text(repo_agent_path)).strip()
-        return content, repo_agent_path
+    sources = [repo_agent_path, tool_root / "templates" / f"{role}.md", tool_root / "templates" / "qa_tester.md"]
+    tokenizer = tokenizer or HeuristicTokenizer()
+    return memoized(("role", project_root, tool_root, role, tokenizer.name), sources,
+                    lambda: _load_role_prompt_from(tool_root, role, repo_agent_path, tokenizer))
+
+def _load_role_prompt_from(tool_root: Path, role: str, repo_agent_path: Path,
+                           tokenizer: "Tokenizer") -> Tuple["RolePrompt", Optional[Path]]:
+    from .prompts import ARTEFACT_VERSION, RolePrompt, compile_prompt
+
+    compiled = derived_from_file(repo_agent_path, ("role_prompt", ARTEFACT_VERSION, tokenizer.name),
+                                 lambda text: compile_prompt(repo_agent_path, text, tokenizer))
+    if compiled is not None:
+        return RolePrompt.from_dict(compiled), repo_agent_path
 
     template_path = tool_root / "templates" / f"{role}.md"
     if not template_path.exists():
@@ -156,24 +368,127 @@ def load_role_prompt(project_root: Path, tool_root: Path, role: str) -> Tuple[st
             template_path = tool_root / "templates" / "qa_tester.md"
         else:
             raise FileNotFoundError(f"Template not found for role '{role}' at {template_path}")
-    return read_text(template_path).strip(), None
+    compiled = derived_from_file(template_path, ("role_prompt", ARTEFACT_VERSION, tokenizer.name),
+                                 lambda text: compile_prompt(template_path, text, tokenizer, frontmatter=False))
+    if compiled is None:
+        raise FileNotFoundError(f"Template not found for role '{role}' at {template_path}")
+    return RolePrompt.from_dict(compiled), None
+
+def render_role_prompt(project_root: Path, tool_root: Path, role: str, cfg: Dict) -> Tuple[str, Optional[Path]]:
+    """The role prompt with its variables filled in, and the agent file it came from."""
+    from .prompts import variable_values
+    from .stats import record_prompt
+    from .tokenizer import load_tokenizer
+
+    tokenizer = load_tokenizer(cfg.get("tokenizer"), project_root)
+    prompt, agent_path = load_role_prompt(project_root, tool_root, role, tokenizer)
+    values = variable_values(prompt, role, lambda: current_branch(project_root))
+    text = prompt.render(values)
+    record_prompt(prompt.source, tokenizer.count(text) if values else prompt.tokens, prompt.metadata)
+    return text, agent_path
+
+def read_baseline_section(project_root: Path, rel: str, max_tokens: int,
+                          tokenizer: Optional["Tokenizer"] = None) -> Optional[Tuple[str, str, int]]:
+    """(title, summary capped at max_tokens, its token count) for a baseline file."""
+    from .tokenizer import HeuristicTokenizer
 
-def read_baseline_section(project_root: Path, rel: str, max_tokens: int) -> Optional[Tuple[str,str]]:
     p = (project_root / rel)
-    if not p.exists():
+    tokenizer = tokenizer or HeuristicTokenizer()
+    return memoized(("baseline", p, max_tokens, tokenizer.name), [p],
+                    lambda: _read_baseline_section(p, rel, max_tokens, tokenizer))
+
+def _read_baseline_section(p: Path, rel: str, max_tokens: int, tokenizer: "Tokenizer") -> Optional[Tuple[str, str, int]]:
+    value = derived_from_file(p, ("baseline", max_tokens, tokenizer.name),
+                              lambda raw: _materialize_baseline(raw, max_tokens, tokenizer))
+    if value is None:
         return None
-    raw = read_text(p)
-    summary = extract_summary_block(raw)
+    title = rel
+    return title, value["content"], value["tokens"]
+
+def _materialize_baseline(raw: str, max_tokens: int, tokenizer: "Tokenizer") -> Dict:
+    from .docscan import scan
+
+    summary = scan(raw).summary_text()
     content = summary if summary else raw.strip()
     # token cap
-    if approx_tokens(content) > max_tokens:
-        chars = max_tokens * 4
-        content = (content[:chars] + "\n…(truncated)…").strip()
-    title = rel
-    return title, content
+    if tokenizer.count(content) > max_tokens:
+        content = (tokenizer.truncate(content, max_tokens) + "\n…(truncated)…").strip()
+    return {"content": content, "tokens": tokenizer.count(content)}
+
+def read_tail_section(project_root: Path, rel: str, max_lines: int,
+                      tokenizer: Optional["Tokenizer"] = None) -> Optional[Tuple[str, int]]:
+    """Summary block of a notes-style file, or its last `max_lines` lines, and its token count."""
+    from .tokenizer import HeuristicTokenizer
+
+    p = project_root / rel
+    tokenizer = tokenizer or HeuristicTokenizer()
+    return memoized(("tail", p, max_lines, tokenizer.name), [p], lambda: _read_tail_section(p, max_lines, tokenizer))
+
+def _read_tail_section(p: Path, max_lines: int, tokenizer: "Tokenizer") -> Optional[Tuple[str, int]]:
+    value = derived_from_stat(p, ("tail", max_lines, tokenizer.name),
+                              lambda path: _materialize_tail(path, max_lines, tokenizer))
+    if value is None:
+        return None
+    return value["content"], value["tokens"]
+
+def _materialize_tail(p: Path, max_lines: int, tokenizer: "Tokenizer") -> Dict:
+    from .textio import read_summary_block, read_tail_lines
+
+    # Streams from the end of the file: notes only grow, and we keep just the tail.
+    summary = read_summary_block(p)
+    content = summary if summary else read_tail_lines(p, max_lines)
+    return {"content": content, "tokens": tokenizer.count(content)}
+
+def relevant_docs_section(project_root: Path, cfg: Dict, query: str, max_tokens: int,
+                          tokenizer: "Tokenizer") -> Optional[str]:
+    """Best-matching docs chunks (see retrieval.py) that fit in max_tokens, best first."""
+    from .retrieval import DEFAULT_MAX_CHUNKS, docs_index, render_chunk
+
+    index = docs_index(project_root, cfg.get("retrieval_dirs"))
+    # Files already in the pack would only be repeated.
+    included = [*cfg.get("baseline_files", []), cfg.get("session_notes_file"), cfg.get("protocol_file")]
+    exclude = {Path(rel).as_posix() for rel in included if rel}
+    max_chunks = int(cfg.get("retrieval_max_chunks", DEFAULT_MAX_CHUNKS))
+    picked: List[str] = []
+    used = 0
+    for _, chunk in index.search(query, exclude)[:max_chunks * 4]:
+        if len(picked) >= max_chunks:
+            break
+        text = render_chunk(chunk)
+        n = tokenizer.count(text)
+        if used + n <= max_tokens:
+            picked.append(text)
+            used += n
+    return "\n\n".join(picked) or None
+
+def _fill_counts(known: List[Optional[int]], texts: List[str], tokenizer: "Tokenizer") -> List[int]:
+    """`known`, with the missing counts filled in by one count_many call."""
+    missing = [i for i, n in enumerate(known) if n is None]
+    counts = known[:]
+    if missing:
+        for i, n in zip(missing, tokenizer.count_many([texts[i] for i in missing])):
+            counts[i] = n
+    return counts
+
+def build_context_pack(project_root: Path, cfg: Dict, instruction: str, selection: Optional[str], diff_text: Union[str, "DiffSummary", None], *, role_name: str, role_agent_path: Optional[Path], budget_report: Optional[List[Dict]] = None) -> str:
+    return build_pack(project_root, cfg, instruction, selection, diff_text, role_name=role_name,
+                      role_agent_path=role_agent_path, budget_report=budget_report).text()
 
-def build_context_pack(project_root: Path, cfg: Dict, instruction: str, selection: Optional[str], diff_text: Optional[str], *, role_name: str, role_agent_path: Optional[Path]) -> str:
+def build_pack(project_root: Path, cfg: Dict, instruction: str, selection: Optional[str], diff_text: Union[str, "DiffSummary", None], *, role_name: str, role_agent_path: Optional[Path], budget_report: Optional[List[Dict]] = None) -> "Pack":
+    """The context pack as separate sections (see render.py); role_prompt is left empty."""
+    from .budget import BudgetItem, allocate, default_min_tokens, trim_to_boundary
+    from .render import Pack, PackSection
+    from .tokenizer import load_tokenizer
+
+    started = perf_counter()
     budget = int(cfg.get("token_budget", 2200))
+    tokenizer = load_tokenizer(cfg.get("tokenizer"), project_root)
+    # A DiffSummary unless the diff came as text; checked without importing diffstage.
+    diff_summary = diff_text if diff_text is not None and not isinstance(diff_text, str) else None
+    if diff_summary is not None:
+        diff_text = diff_section(diff_summary, None, tokenizer)
+    record_stage("inputs", started)
+    started = perf_counter()
 
     # High-priority sections (never trimmed too aggressively)
     header_lines = []
@@ -186,6 +501,7 @@ def build_context_pack(project_root: Path, cfg: Dict, instruction: str, selectio
     header = "\n".join(header_lines).strip()
 
     sections: List[Tuple[str, str, int]] = []  # (title, content, priority)
+    counted: Dict[str, int] = {}  # title -> token count, for sections read from the cache
     # priority: higher = keep more
     sections.append(("Instruction", instruction.strip(), 100))
     if selection:
@@ -203,22 +519,18 @@ def build_context_pack(project_root: Path, cfg: Dict, instruction: str, selectio
     # Session notes (tail)
     sn_rel = cfg.get("session_notes_file")
     if sn_rel:
-        sn_path = project_root / sn_rel
-        if sn_path.exists():
-            sn_raw = read_text(sn_path)
-            sn_summary = extract_summary_block(sn_raw)
-            sn = sn_summary if sn_summary else tail_lines(sn_raw, int(cfg.get("session_notes_tail_lines", 80)))
-            sections.append(("Recent SESSION_NOTES", sn, 35))
+        sn = read_tail_section(project_root, sn_rel, int(cfg.get("session_notes_tail_lines", 80)), tokenizer)
+        if sn is not None:
+            sections.append(("Recent SESSION_NOTES", sn[0], 35))
+            counted["Recent SESSION_NOTES"] = sn[1]
 
     # Protocol excerpt (tail)
     proto_rel = cfg.get("protocol_file")
     if proto_rel:
-        proto_path = project_root / proto_rel
-        if proto_path.exists():
-            proto_raw = read_text(proto_path)
-            proto_summary = extract_summary_block(proto_raw)
-            proto = proto_summary if proto_summary else tail_lines(proto_raw, int(cfg.get("protocol_tail_lines", 120)))
-            sections.append(("AGENT_SESSION_PROTOCOL", proto, 25))
+        proto = read_tail_section(project_root, proto_rel, int(cfg.get("protocol_tail_lines", 120)), tokenizer)
+        if proto is not None:
+            sections.append(("AGENT_SESSION_PROTOCOL", proto[0], 25))
+            counted["AGENT_SESSION_PROTOCOL"] = proto[1]
 
     # Materialize baseline file sections (which are stored as rel paths above)
     materialized: List[Tuple[str, str, int]] = []
@@ -226,89 +538,118 @@ def build_context_pack(project_root: Path, cfg: Dict, instruction: str, selectio
         if title in ("NOW", "PROJECT_CONTEXT") and isinstance(content, str) and content.endswith(".md"):
             # It's a rel path
             max_tok = 450 if title == "NOW" else 650
-            rb = read_baseline_section(project_root, content, max_tokens=max_tok)
+            rb = read_baseline_section(project_root, content, max_tokens=max_tok, tokenizer=tokenizer)
             if rb:
-                t, c = rb
+                t, c, n = rb
                 materialized.append((t, c, prio))
+                counted[t] = n
             continue
         materialized.append((title, content, prio))
+    record_stage("baseline_reads", started)
+    started = perf_counter()
 
-    # Budgeting: allocate more to higher priority, but keep everything if possible.
-    # We'll trim lower-priority sections first.
-    def section_tokens(txt: str) -> int:
-        return approx_tokens(txt)
+    # Docs chunks ranked against the instruction, within their share of the budget
+    share = float(cfg.get("retrieval_share", 0) or 0)
+    if share > 0:
+        query = instruction + "\n" + (selection or "")
+        docs = relevant_docs_section(project_root, cfg, query, int(budget * share), tokenizer)
+        if docs:
+            materialized.append(("Relevant docs", docs, 55))
+        record_stage("retrieval", started)
+        started = perf_counter()
 
-    # Prepare pretty formatting
-    out_parts = [header, ""]
     # Reserve ~100 tokens for framing + markdown overhead
     remaining = max(200, budget - 100)
 
-    # Sort by priority desc for initial inclusion, but we'll render in a logical order later.
-    # First, trim if needed.
+    # Budgeting: split what's left between sections by priority (weighted
+    # water-filling, see budget.py), keeping everything if it already fits.
+    # We render in a logical order later.
     mats = materialized[:]
-    total = sum(section_tokens(c) for _, c, _ in mats)
-    if total > remaining:
-        # Trim in ascending priority order
-        mats_sorted = sorted(mats, key=lambda x: x[2])
-        over = total - remaining
-        trimmed = []
-        for title, content, prio in mats_sorted:
-            if over <= 0:
-                trimmed.append((title, content, prio))
-                continue
-            # Determine minimum tokens we keep for this section based on priority.
-            min_keep = 120 if prio >= 60 else 80 if prio >= 35 else 60
-            tok = section_tokens(content)
-            if tok <= min_keep:
-                trimmed.append((title, content, prio))
-                continue
-            # Reduce this section
-            reducible = tok - min_keep
-            cut = min(reducible, over)
-            new_tok = tok - cut
-            chars = new_tok * 4
-            new_content = (content[:chars] + "\n…(truncated)…").strip()
-            trimmed.append((title, new_content, prio))
-            over -= cut
-        mats = trimmed
+    # Count the sections the cache has no count for in one batched pass.
+    known = [counted.get(t) for t, _, _ in mats]
+    store = _section_store
+    if store is None:
+        counts = _fill_counts(known, [c for _, c, _ in mats], tokenizer)
+    else:
+        from .incremental import config_digest
+        store.begin()
+        keys = store.section_keys([(t, c) for t, c, _ in mats], tokenizer, config_digest(cfg))
+        counts = store.counts(keys, [c for _, c, _ in mats], tokenizer, known)
+    items = [BudgetItem(title, tok, default_min_tokens(prio), prio) for (title, _, prio), tok in zip(mats, counts)]
+    alloc = allocate(items, remaining)
+    kept = counts[:]
+    if sum(counts) > remaining:
+        # Trim lowest priority first, so tokens left over by cutting at a line
+        # break flow on to the next (more important) section.
+        slack = 0
+        for i in sorted(range(len(mats)), key=lambda j: mats[j][2]):
+            title, content, prio = mats[i]
+            target = alloc[i] + slack
+            if counts[i] > target:
+                reused = store.trimmed(keys[i], target) if store is not None else None
+                if reused is not None:
+                    content, kept[i] = reused
+                else:
+                    if title == "Diff" and diff_summary is not None:
+                        # Keep the most relevant hunks rather than the first ones.
+                        content = diff_section(diff_summary, target, tokenizer)
+                    else:
+                        content = trim_to_boundary(content, target, tokenizer)
+                    kept[i] = tokenizer.count(content)
+                    if store is not None:
+                        store.put_trimmed(keys[i], target, content, kept[i])
+                mats[i] = (title, content, prio)
+            slack = max(0, target - kept[i])
+    rows = [{
+        "title": item.title, "priority": item.weight, "tokens": item.max_tokens,
+        "min_tokens": item.min_tokens, "allocated": a, "kept": k,
+    } for item, a, k in zip(items, alloc, kept)]
+    if budget_report is not None:
+        budget_report.extend(rows)
+    pack_stats = current_stats()
+    if pack_stats is not None:
+        pack_stats.set_sections(rows)
+    if store is not None:
+        store.save()
+    record_stage("trimming", started)
+    started = perf_counter()
 
     # Render in deterministic order:
-    render_order = ["Instruction", "docs/NOW.md", "docs/PROJECT_CONTEXT.md", "Recent SESSION_NOTES", "AGENT_SESSION_PROTOCOL", "Selection", "Diff"]
+    render_order = ["Instruction", "docs/NOW.md", "docs/PROJECT_CONTEXT.md", "Relevant docs", "Recent SESSION_NOTES", "AGENT_SESSION_PROTOCOL", "Selection", "Diff"]
     # Map titles
     rendered = []
     for wanted in render_order:
-        for title, content, prio in mats:
+        for i, (title, _, _) in enumerate(mats):
             if title == wanted:
-                rendered.append((title, content))
+                rendered.append(i)
     # Also include any leftovers
-    existing_titles = {t for t,_ in rendered}
-    for title, content, _ in mats:
+    existing_titles = {mats[i][0] for i in rendered}
+    for i, (title, _, _) in enumerate(mats):
         if title not in existing_titles:
-            rendered.append((title, content))
-
-    for title, content in rendered:
-        if title == "Instruction":
-            out_parts.append("## Instruction")
-            out_parts.append(content.strip())
-            out_parts.append("")
-        elif title in ("Selection", "Diff"):
-            # already includes markdown header/fence
-            out_parts.append(content.strip())
-            out_parts.append("")
-        else:
-            out_parts.append(f"## {title}")
-            out_parts.append(content.strip())
-            out_parts.append("")
-
-    out_parts.append("SESSION END – INSTRUCTIONS")
-    out_parts.append("")
-    out_parts.append("When you finish your response, include a short section titled 'Session Updates' with:")
-    out_parts.append("- 2–5 bullets summarizing what we did")
-    out_parts.append("- Any updates needed for docs/NOW.md and docs/SESSION_NOTES.md (per AGENT_SESSION_PROTOCOL)")
-    out_parts.append("- Next actions (if any)")
-    return "\n".join(out_parts).strip()
+            rendered.append(i)
+
+    pack_sections = []
+    for i in rendered:
+        title, content, prio = mats[i]
+        # Selection/Diff already include their markdown header/fence
+        heading = None if title in ("Selection", "Diff") else f"## {title}"
+        pack_sections.append(PackSection(title, heading, content.strip(), prio, counts[i], alloc[i], kept[i]))
+
+    footer = [
+        "SESSION END – INSTRUCTIONS",
+        "",
+        "When you finish your response, include a short section titled 'Session Updates' with:",
+        "- 2–5 bullets summarizing what we did",
+        "- Any updates needed for docs/NOW.md and docs/SESSION_NOTES.md (per AGENT_SESSION_PROTOCOL)",
+        "- Next actions (if any)",
+    ]
+    pack = Pack(role_name, "", header, pack_sections, footer)
+    record_stage("render", started)
+    return pack
 
 def run_git(args: List[str], *, cwd: Path, capture: bool = False, check: bool = True) -> str:
+    import subprocess
+
     try:
         result = subprocess.run(
             ["git", *args],
@@ -326,6 +667,99 @@ def run_git(args: List[str], *, cwd: Path, capture: bool = False, check: bool =
         raise RuntimeError(f"git {' '.join(args)} failed: {details}")
     return result.stdout if capture else ""
 
+@contextmanager
+def git_stream(args: List[str], *, cwd: Path) -> Iterator[TextIO]:
+    """Run git and yield its stdout as a text stream (for output too big to capture)."""
+    import subprocess
+    import tempfile
+
+    with tempfile.TemporaryFile() as err:
+        try:
+            proc = subprocess.Popen(
+                ["git", *args], cwd=cwd, stdout=subprocess.PIPE, stderr=err,
+                text=True, encoding="utf-8", errors="replace",
+            )
+        except FileNotFoundError:
+            raise RuntimeError("git not found on PATH")
+        try:
+            yield proc.stdout
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            err.seek(0)
+            details = err.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"git {' '.join(args)} failed: {details}")
+
+def git_diff_summary(project_root: Path, cfg: Dict, *, rev: Optional[str], staged: bool,
+                     selection: Optional[str] = None) -> Optional["DiffSummary"]:
+    """Summarize `git diff [--cached] [rev]`, streaming git's output into the diff stage.
+
+    Staged diffs are fully determined by the base commit and the staged blobs
+    (`git diff --cached --raw`), so they are cached under that key; the raw
+    listing itself is reused for as long as .git/index is unchanged. Working-tree
+    diffs depend on unstaged files and always run git.
+    """
+    from .diffstage import DEFAULT_EXCLUDE, DiffSummary
+
+    args = ["diff", "--no-color", "--no-ext-diff"] + (["--cached"] if staged else []) + ([rev] if rev else []) + ["--"]
+    key = None
+    if staged and _disk_cache is not None:
+        base = git_commit_and_dir(project_root, rev or "HEAD")
+        if base is not None:
+            commit, git_dir = base
+            import hashlib
+            staged_digest = index_digest(project_root, git_dir, commit)
+            if staged_digest is not None:
+                key = ("git-diff", commit, staged_digest, input_char_cap(cfg),
+                       list(cfg.get("diff_exclude", DEFAULT_EXCLUDE)),
+                       hashlib.sha1((selection or "").encode("utf-8")).hexdigest())
+                cached = _disk_cache.get_value(key)
+                if cached is not None:
+                    return DiffSummary.from_dict(cached) if cached else None
+    with git_stream(args, cwd=project_root) as stream:
+        summary = summarize_diff_stream(stream, cfg, selection)
+    if key is not None:
+        _disk_cache.put_value(key, summary.to_dict() if summary is not None else {})
+    return summary
+
+def git_commit_and_dir(project_root: Path, rev: str) -> Optional[Tuple[str, Path]]:
+    """(commit sha of rev, absolute git dir) in one git call; None if rev does not resolve."""
+    try:
+        out = run_git(["rev-parse", "--absolute-git-dir", "--verify", f"{rev}^{{commit}}"],
+                      cwd=project_root, capture=True).split()
+    except RuntimeError:
+        return None
+    return (out[1], Path(out[0])) if len(out) == 2 else None
+
+def index_digest(project_root: Path, git_dir: Path, commit: str) -> Optional[str]:
+    """Digest of `git diff --cached --raw commit`, reused while .git/index is unchanged.
+
+    The raw listing names every staged blob (and every unmerged path), so it
+    identifies the staged diff without `git write-tree`, which fails during a
+    conflict and writes tree objects besides. None if git fails; the caller
+    then builds the diff uncached.
+    """
+    import hashlib
+    from .cache import file_signature
+
+    index = git_dir / "index"
+    key = ("index-raw", str(index), commit)
+    cached = _disk_cache.get_value(key) if _disk_cache is not None else None
+    signature = file_signature(index)
+    if cached and tuple(cached["signature"] or ()) == (signature or ()):
+        return cached["digest"]
+    try:
+        raw = run_git(["diff", "--cached", "--raw", "--no-abbrev", "-z", commit, "--"],
+                      cwd=project_root, capture=True)
+    except (RuntimeError, UnicodeDecodeError):
+        return None
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    # Signed before running git: an index rewritten meanwhile just misses next time.
+    if _disk_cache is not None:
+        _disk_cache.put_value(key, {"signature": signature, "digest": digest})
+    return digest
+
 def current_branch(project_root: Path) -> str:
     try:
         return run_git(["rev-parse", "--abbrev-ref", "HEAD"], cwd=project_root, capture=True).strip()
@@ -370,6 +804,9 @@ def print_session_start(project_root: Path, agent_role: str, open_docs: bool) ->
 
     if open_docs:
         print("")
+        import shutil
+        import subprocess
+
         if shutil.which("code"):
             print("Opening docs in VS Code...")
             subprocess.run(
@@ -443,74 +880,399 @@ def print_session_end(project_root: Path, commit_enabled: bool) -> None:
     ]
     print("\n".join(lines))
 
-def commit_session(project_root: Path, remote: str) -> None:
-    run_git(["add", "docs/PROJECT_CONTEXT.md", "docs/NOW.md", "docs/SESSION_NOTES.md"], cwd=project_root)
+def commit_session(project_root: Path, remote: str, *, push_timeout: Optional[float] = None,
+                   push_retries: Optional[int] = None, wait: bool = False) -> None:
+    """Commit the session docs, then push in the background (or in the foreground with `wait`).
 
-    branch = run_git(["rev-parse", "--abbrev-ref", "HEAD"], cwd=project_root, capture=True).strip()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    commit_message = f"Session notes update - {timestamp}"
+    See gitpipeline.py; stage timings are printed to stderr.
+    """
+    import asyncio
+    from .gitpipeline import DEFAULT_PUSH_RETRIES, DEFAULT_PUSH_TIMEOUT, Timings, commit_docs, push, spawn_push
 
-    staged = run_git(["diff", "--cached", "--name-only"], cwd=project_root, capture=True).strip()
-    if staged:
-        run_git(["commit", "-m", commit_message], cwd=project_root)
-    else:
-        print("No changes to commit.")
-
-    status = run_git(["status", "--porcelain"], cwd=project_root, capture=True).strip()
-    if status:
-        other_paths = []
-        for line in status.splitlines():
-            path = line[3:]
-            if " -> " in path:
-                path = path.split(" -> ", 1)[1]
-            if not path.startswith("docs/"):
-                other_paths.append(path)
-        if other_paths:
+    push_timeout = DEFAULT_PUSH_TIMEOUT if push_timeout is None else push_timeout
+    push_retries = DEFAULT_PUSH_RETRIES if push_retries is None else push_retries
+    timings = Timings()
+    try:
+        result = asyncio.run(commit_docs(project_root, timings))
+        if not result["committed"]:
+            print("No changes to commit.")
+        if result["other_paths"]:
             print("Warning: non-doc changes remain unstaged.")
 
-    run_git(["push", remote, branch], cwd=project_root)
-    print(f"Pushed branch '{branch}' to {remote}.")
+        branch = result["branch"]
+        started = perf_counter()
+        if not wait:
+            pid = spawn_push(project_root, remote, branch, timeout=push_timeout, retries=push_retries)
+            timings.add("push_spawn", started)
+            print(f"Pushing branch '{branch}' to {remote} in the background (pid {pid}); "
+                  f"progress in .handoffkit/push-status.json.")
+            return
+        print(f"Pushing branch '{branch}' to {remote}...")
+        status = asyncio.run(push(project_root, remote, branch, timeout=push_timeout, retries=push_retries))
+        timings.add("push", started)
+        if status["state"] != "succeeded":
+            raise RuntimeError(f"git push {remote} {branch} failed after {status['attempt']} attempt(s): {status['error']}")
+        print(f"Pushed branch '{branch}' to {remote}.")
+    finally:
+        print(timings.line(), file=sys.stderr)
+
+def push_session(project_root: Path, remote: str, branch: Optional[str], *,
+                 timeout: Optional[float] = None, retries: Optional[int] = None) -> None:
+    """`session push`: push with retries, recording progress in .handoffkit/push-status.json."""
+    import asyncio
+    from .gitpipeline import DEFAULT_PUSH_RETRIES, DEFAULT_PUSH_TIMEOUT, push
 
-def parse_args(argv: Optional[List[str]] = None):
-    ap = argparse.ArgumentParser(prog="handoffkit", description="Universal (LLM-agnostic) handoff prompt builder")
-    subparsers = ap.add_subparsers(dest="command")
+    timeout = DEFAULT_PUSH_TIMEOUT if timeout is None else timeout
+    retries = DEFAULT_PUSH_RETRIES if retries is None else retries
+    branch = branch or current_branch(project_root)
+    if not branch:
+        raise RuntimeError("Could not determine the current branch; pass --branch")
+    status = asyncio.run(push(project_root, remote, branch, timeout=timeout, retries=retries))
+    print(json.dumps(status))
+    if status["state"] != "succeeded":
+        sys.exit(1)
+
+def _add_role_arguments(role_parser: argparse.ArgumentParser) -> None:
+    from .render import FORMATS
 
-    role_parser = subparsers.add_parser("role", help="Generate a role handoff prompt")
     role_parser.add_argument("role", choices=ROLE_CHOICES, help="Role prompt to generate")
     role_parser.add_argument("instruction", help="What you want this role to do")
-    role_parser.add_argument("--root", default=".", help="Path to (or inside) your project root. Can be run from anywhere.")
+    role_parser.add_argument("--root", default=None, help=ROOT_HELP)
     role_parser.add_argument("--config", default=None, help="Path to config JSON (optional). If omitted, auto-discovered.")
     role_parser.add_argument("--selection-file", default=None, help="Path to a file containing your selected snippet (optional)")
-    role_parser.add_argument("--diff", default=None, help="Path to a diff file, or '-' to read diff from stdin (optional)")
+    diff_group = role_parser.add_mutually_exclusive_group()
+    diff_group.add_argument("--diff", default=None, help="Path to a diff file, or '-' to read diff from stdin (optional)")
+    diff_group.add_argument("--diff-from", default=None, metavar="REV", help="Include `git diff REV` (working tree, or index with --staged)")
+    role_parser.add_argument("--staged", action="store_true",
+                             help="Include the staged changes (`git diff --cached [REV]`); not with --diff")
+    role_parser.add_argument("--format", choices=FORMATS, default="text",
+                             help="text (Markdown prompt), json (sections with metadata) or messages (chat role/content array)")
+    role_parser.add_argument("-o", "--output", default=None, metavar="PATH", help="Write the pack to PATH instead of stdout")
+    role_parser.add_argument("--budget-report", action="store_true", help="Print per-section token allocation to stderr")
+    role_parser.add_argument("--profile-startup", action="store_true",
+                             help="Print root discovery, config and template load times to stderr (builds in-process)")
+    role_parser.add_argument("--stats", action="store_true",
+                             help="Print stage timings, bytes read, section tokens and cache hits to stderr")
+    role_parser.add_argument("--stats-json", default=None, metavar="PATH",
+                             help="Write the same stats as JSON to PATH ('-' for stderr)")
+    role_parser.add_argument("--incremental", action="store_true",
+                             help="Reuse unchanged sections' token counts and trims from the previous pack")
+    role_parser.add_argument("--watch", action="store_true",
+                             help="Keep rebuilding the pack into --output (default .handoffkit/pack.md) as docs change")
+    role_parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds for --watch")
+    role_parser.add_argument("--store", action="store_true",
+                             help="Also archive the pack in .handoffkit/packs (always on with pack_store.enabled in config)")
+    role_parser.add_argument("--no-daemon", action="store_true", help="Always build in-process, even if `handoffkit serve` is running")
+
+def _add_batch_arguments(batch_parser: argparse.ArgumentParser) -> None:
+    batch_parser.add_argument("jobs", help="JSONL (or JSON list) of {role, instruction, selection_file, diff} jobs, or '-' for stdin")
+    batch_parser.add_argument("--root", default=None, help=ROOT_HELP)
+    batch_parser.add_argument("--config", default=None, help="Path to config JSON (optional). If omitted, auto-discovered.")
+    batch_parser.add_argument("--workers", type=int, default=4, help="Number of packs built concurrently")
+
+def _add_fanout_arguments(fanout_parser: argparse.ArgumentParser) -> None:
+    from .render import FORMATS
+
+    fanout_parser.add_argument("role", choices=ROLE_CHOICES, help="Role prompt to generate")
+    fanout_parser.add_argument("instruction", help="What you want this role to do")
+    fanout_parser.add_argument("roots", nargs="*", help="Project root directories")
+    fanout_parser.add_argument("--discover", default=None, metavar="DIR",
+                               help="Also use every directory under DIR that has docs/PROJECT_CONTEXT.md")
+    fanout_parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Worker processes")
+    fanout_parser.add_argument("--out-dir", default=None,
+                               help="Where packs and index.json/index.md go (default: <base>/.handoffkit/fanout)")
+    fanout_parser.add_argument("--format", choices=FORMATS, default="text", help="Output format of each pack")
+    fanout_parser.add_argument("--config", default=None, help="Config JSON for every project (default: each project's own)")
+
+def _add_cache_arguments(cache_parser: argparse.ArgumentParser) -> None:
+    cache_parser.add_argument("cache_command", choices=["stats", "clear"], help="Show cache statistics or remove all entries")
+    cache_parser.add_argument("--root", default=None, help=ROOT_HELP)
+    cache_parser.add_argument("--config", default=None, help="Path to config JSON (optional). If omitted, auto-discovered.")
+
+def _add_packs_arguments(packs_parser: argparse.ArgumentParser) -> None:
+    from .render import FORMATS
 
-    session_parser = subparsers.add_parser("session", help="Start or end a session")
+    packs_subparsers = packs_parser.add_subparsers(dest="packs_command", required=True)
+    packs_list = packs_subparsers.add_parser("list", help="Stored packs, newest first")
+    packs_list.add_argument("--role", default=None, choices=ROLE_CHOICES, help="Only packs for this role")
+    packs_list.add_argument("--branch", default=None, help="Only packs built on this git branch")
+    packs_list.add_argument("--since", default=None, metavar="TIME", help="Only packs created at or after TIME (UTC, e.g. 2026-10-18T09)")
+    packs_list.add_argument("--until", default=None, metavar="TIME", help="Only packs created at or before TIME (UTC prefix)")
+    packs_list.add_argument("--limit", type=int, default=None, help="At most this many packs")
+    packs_list.add_argument("--json", action="store_true", help="One JSON index entry per line")
+    packs_show = packs_subparsers.add_parser("show", help="Reproduce a stored pack exactly")
+    packs_show.add_argument("pack_id", help="Pack id, or an unambiguous prefix of it")
+    packs_show.add_argument("--format", choices=FORMATS, default="text", help="Output format")
+    packs_show.add_argument("-o", "--output", default=None, metavar="PATH", help="Write the pack to PATH instead of stdout")
+    packs_subparsers.add_parser("prune", help="Apply the retention policy and delete unreferenced objects")
+    packs_subparsers.add_parser("stats", help="Show pack store size")
+    for sub in packs_subparsers.choices.values():
+        sub.add_argument("--root", default=None, help=ROOT_HELP)
+        sub.add_argument("--config", default=None, help="Path to config JSON (optional). If omitted, auto-discovered.")
+
+def _add_serve_arguments(serve_parser: argparse.ArgumentParser) -> None:
+    serve_parser.add_argument("--root", default=None, help=ROOT_HELP)
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to bind (loopback only by default)")
+    serve_parser.add_argument("--port", type=int, default=0, help="Port to bind (default: pick a free port)")
+
+def _add_session_arguments(session_parser: argparse.ArgumentParser) -> None:
     session_subparsers = session_parser.add_subparsers(dest="session_command", required=True)
 
     start_parser = session_subparsers.add_parser("start", help="Print the session start prompt")
-    start_parser.add_argument("--root", default=".", help="Path to (or inside) your project root. Can be run from anywhere.")
+    start_parser.add_argument("--root", default=None, help=ROOT_HELP)
     start_parser.add_argument("--agent-role", default="Coder", choices=SESSION_ROLE_CHOICES, help="Agent role to reference")
     start_parser.add_argument("--open-docs", action="store_true", help="Open memory docs in VS Code if available")
 
     end_parser = session_subparsers.add_parser("end", help="Print the session end prompt")
-    end_parser.add_argument("--root", default=".", help="Path to (or inside) your project root. Can be run from anywhere.")
-    end_parser.add_argument("--commit", action="store_true", help="Commit and push after the agent updates docs")
+    end_parser.add_argument("--root", default=None, help=ROOT_HELP)
+    end_parser.add_argument("--commit", action="store_true",
+                            help="Commit the docs after the agent updates them, then push in the background "
+                                 "(exit status covers the commit; push result in .handoffkit/push-status.json)")
     end_parser.add_argument("--remote", default="origin", help="Git remote name to push to")
+    end_parser.add_argument("--push-wait", action="store_true",
+                            help="Push in the foreground and exit nonzero if the push fails")
+    end_parser.add_argument("--push-timeout", type=float, default=None, help="Seconds per push attempt (default 60)")
+    end_parser.add_argument("--push-retries", type=int, default=None, help="Push retries after a failure (default 2)")
+
+    push_parser = session_subparsers.add_parser(
+        "push", help="Push with a timeout and retries, writing progress to .handoffkit/push-status.json")
+    push_parser.add_argument("--root", default=None, help=ROOT_HELP)
+    push_parser.add_argument("--remote", default="origin", help="Git remote name to push to")
+    push_parser.add_argument("--branch", default=None, help="Branch to push (default: the current branch)")
+    push_parser.add_argument("--timeout", type=float, default=None, help="Seconds per push attempt (default 60)")
+    push_parser.add_argument("--retries", type=int, default=None, help="Retries after a failure (default 2)")
 
+# (name, help, adds the command's arguments), in `handoffkit --help` order.
+COMMANDS: List[Tuple[str, str, Callable[[argparse.ArgumentParser], None]]] = [
+    ("role", "Generate a role handoff prompt", _add_role_arguments),
+    ("batch", "Build many role packs in one process and stream them as JSONL", _add_batch_arguments),
+    ("fanout", "Build one role pack per project (monorepo) on a process pool", _add_fanout_arguments),
+    ("cache", "Inspect or clear the on-disk section cache", _add_cache_arguments),
+    ("packs", "List, reproduce or prune packs archived with `role --store`", _add_packs_arguments),
+    ("serve", "Run a warm-cache daemon that builds role packs on request", _add_serve_arguments),
+    ("session", "Start or end a session", _add_session_arguments),
+]
+
+def parse_args(argv: Optional[List[str]] = None):
     if argv is None:
         argv = sys.argv[1:]
     if argv and argv[0] in ROLE_CHOICES:
         argv = ["role"] + argv
+
+    ap = argparse.ArgumentParser(prog="handoffkit", description="Universal (LLM-agnostic) handoff prompt builder")
+    # Building every subcommand's parser costs milliseconds per run; only the
+    # one being run needs one. `handoffkit --help` and an unknown command
+    # still get them all (without arguments) for the listing, and the usage
+    # line names every command either way.
+    wanted = argv[0] if argv else None
+    commands = [c for c in COMMANDS if c[0] == wanted] or COMMANDS
+    metavar = "{" + ",".join(c[0] for c in COMMANDS) + "}" if len(commands) < len(COMMANDS) else None
+    subparsers = ap.add_subparsers(dest="command", metavar=metavar)
+    parsers = {}
+    for name, help_text, add_arguments in commands:
+        parsers[name] = subparsers.add_parser(name, help=help_text)
+        if name == wanted:
+            add_arguments(parsers[name])
+
     if not argv:
         ap.print_help()
         sys.exit(2)
-    return ap.parse_args(argv)
+    args = ap.parse_args(argv)
+    if args.command == "role" and args.staged and args.diff:
+        parsers["role"].error("argument --staged: not allowed with argument --diff")
+    if args.command == "fanout" and not args.roots and not args.discover:
+        parsers["fanout"].error("fanout needs ROOTS or --discover")
+    return args
+
+def render_role_output(project_root: Path, tool_root: Path, config_path: Optional[str], role: str, instruction: str,
+                       selection: Optional[str], diff_text: Union[str, "DiffSummary", None], *,
+                       cfg: Optional[Dict] = None, budget_report: Optional[List[Dict]] = None) -> str:
+    """Role prompt plus context pack, as text."""
+    pack = render_role_pack(project_root, tool_root, config_path, role, instruction, selection, diff_text,
+                            cfg=cfg, budget_report=budget_report)
+    return pack.role_prompt + "\n\n" + pack.text()
+
+def render_role_pack(project_root: Path, tool_root: Path, config_path: Optional[str], role: str, instruction: str,
+                     selection: Optional[str], diff_text: Union[str, "DiffSummary", None], *,
+                     cfg: Optional[Dict] = None, budget_report: Optional[List[Dict]] = None) -> "Pack":
+    """Role prompt plus context pack, as a Pack ready for any output format.
+
+    Stages, reads and cache events are recorded into the current PackStats (a
+    fresh one if none is current), which stats hooks receive once the pack is built.
+    """
+    with collecting(current_stats() or PackStats()) as pack_stats:
+        started = perf_counter()
+        if cfg is None:
+            cfg = load_config(project_root, tool_root, config_path)
+            record_stage("config", started)
+        configure_disk_cache(project_root, cfg)
+        started = perf_counter()
+        role_prompt, agent_path = render_role_prompt(project_root, tool_root, role, cfg)
+        record_stage("role_prompt", started)
+        pack = build_pack(
+            project_root, cfg, instruction, selection, diff_text,
+            role_name=role, role_agent_path=agent_path, budget_report=budget_report
+        )
+    emit_stats(pack_stats)
+    return pack._replace(role_prompt=role_prompt)
+
+def print_startup_profile(pack_stats: PackStats) -> None:
+    stages = pack_stats.stages
+    parts = [f"{stage} {stages[stage] * 1000:.2f}" for stage in ("discovery", "config", "role_prompt") if stage in stages]
+    print("startup profile (ms): " + "  ".join(parts), file=sys.stderr)
+
+def print_stats(pack_stats: PackStats) -> None:
+    data = pack_stats.to_dict()
+    stages = "  ".join(f"{name} {ms:.2f}" for name, ms in data["stages_ms"].items())
+    print(f"stages (ms): {stages}  (total {data['total_ms']:.2f})", file=sys.stderr)
+    print(f"bytes read: {data['total_bytes_read']}", file=sys.stderr)
+    if data["role_prompt"]:
+        print(f"role prompt: {data['role_prompt']['tokens']} tokens  ({data['role_prompt']['source']})", file=sys.stderr)
+    for path, nbytes in data["bytes_read"].items():
+        print(f"  {nbytes:>10}  {path}", file=sys.stderr)
+    print("section                      tokens  alloc  kept", file=sys.stderr)
+    for row in data["sections"]:
+        print(f"{row['title'][:28]:<28} {row['tokens_before']:>7} {row['allocated']:>6} {row['tokens_after']:>5}",
+              file=sys.stderr)
+    caches = "  ".join(f"{name} {c['hits']} hit / {c['misses']} miss" for name, c in data["cache"].items())
+    print(f"cache: {caches or 'not used'}", file=sys.stderr)
+
+def write_stats_json(pack_stats: PackStats, dest: str) -> None:
+    text = json.dumps(pack_stats.to_dict(), indent=2)
+    if dest == "-":
+        print(text, file=sys.stderr)
+    else:
+        Path(dest).write_text(text + "\n", encoding="utf-8")
+
+def print_budget_report(report: List[Dict]) -> None:
+    print("section                      prio  tokens  min  alloc  kept", file=sys.stderr)
+    for row in report:
+        print(f"{row['title'][:28]:<28} {row['priority']:>4} {row['tokens']:>7} {row['min_tokens']:>4} "
+              f"{row['allocated']:>6} {row['kept']:>5}", file=sys.stderr)
+
+def load_batch_jobs(path_str: str) -> List[Dict]:
+    text = sys.stdin.read() if path_str == "-" else read_text(Path(path_str))
+    if text.lstrip().startswith("["):
+        jobs = json.loads(text)
+    else:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            raise ValueError(f"job {i}: expected an object, got {type(job).__name__}")
+    return jobs
+
+def run_batch(project_root: Path, tool_root: Path, jobs_path: str, config_path: Optional[str], workers: int) -> int:
+    """Build every job's pack on a thread pool; print one JSON line per job as it finishes.
+
+    Config, role prompts and baseline sections are shared through a warm cache,
+    and each distinct selection/diff input is read once. Returns the number of
+    failed jobs.
+    """
+    global _warm_cache
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from .cache import WarmCache
+
+    if _warm_cache is None:
+        _warm_cache = WarmCache()
+    jobs = load_batch_jobs(jobs_path)
+    cfg = load_config(project_root, tool_root, config_path)
+    max_chars = input_char_cap(cfg)
+
+    def input_key(job: Dict, key: str) -> Optional[Tuple]:
+        path_str = job.get(key)
+        if not path_str:
+            return None
+        if key == "diff" and path_str != "-":
+            # Hunk ranking depends on the selection, so parse once per pair.
+            return (key, path_str, job.get("selection_file"))
+        return (key, path_str)
+
+    inputs: Dict[Tuple, object] = {}
+    for job in jobs:
+        for key in ("selection_file", "diff"):
+            ikey = input_key(job, key)
+            if ikey is None or ikey in inputs:
+                continue
+            if ikey[1] == "-" and jobs_path == "-":
+                inputs[ikey] = ValueError("stdin is already used for the job list")
+                continue
+            try:
+                if key == "diff":
+                    sel = inputs.get(input_key(job, "selection_file") or ())
+                    inputs[ikey] = read_diff_input(ikey[1], project_root=project_root, cfg=cfg,
+                                                   selection=sel if isinstance(sel, str) else None)
+                else:
+                    inputs[ikey] = read_optional_input(ikey[1], project_root=project_root, label="Selection",
+                                                       max_chars=max_chars)
+            except FileNotFoundError as e:
+                inputs[ikey] = e
+
+    def shared_input(job: Dict, key: str):
+        ikey = input_key(job, key)
+        if ikey is None:
+            return None
+        value = inputs[ikey]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def build(job: Dict) -> str:
+        role = job.get("role")
+        if role not in ROLE_CHOICES:
+            raise ValueError(f"invalid role {role!r} (choose from {', '.join(ROLE_CHOICES)})")
+        if not job.get("instruction"):
+            raise ValueError("missing 'instruction'")
+        with collecting(PackStats()):
+            return render_role_output(
+                project_root, tool_root, config_path, role, job["instruction"],
+                shared_input(job, "selection_file"), shared_input(job, "diff"),
+            )
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(build, job): i for i, job in enumerate(jobs)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            result: Dict = {"index": i, "role": jobs[i].get("role"), "instruction": jobs[i].get("instruction")}
+            try:
+                result["output"] = fut.result()
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                failures += 1
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+    return failures
+
+def serve_daemon(project_root: Path, tool_root: Path, host: str, port: int) -> None:
+    global _warm_cache
+    from .cache import WarmCache
+    from .daemon import serve
+    from .diffstage import DiffSummary
+
+    _warm_cache = WarmCache()
+
+    def handle(request: Dict) -> Dict:
+        report: List[Dict] = []
+        diff = request.get("diff")
+        if request.get("diff_summary"):
+            diff = DiffSummary.from_dict(request["diff_summary"])
+        with collecting(PackStats()) as pack_stats:
+            pack = render_role_pack(
+                project_root, tool_root, request.get("config"), request["role"], request["instruction"],
+                request.get("selection"), diff, budget_report=report,
+            )
+        return {"pack": pack.to_dict(), "budget_report": report, "stats": pack_stats.to_dict()}
+
+    serve(project_root, handle, host=host, port=port)
 
 def main():
     args = parse_args()
 
+    # Tool root is where this package lives (templates/config shipped with kit).
+    tool_root = Path(__file__).resolve().parent
+
     if args.command == "session":
-        invocation_root = Path(args.root).resolve()
-        project_root = find_project_root(invocation_root)
+        project_root = discover_project_root(args.root)
         if args.session_command == "start":
             print_session_start(project_root, args.agent_role, args.open_docs)
             return
@@ -519,34 +1281,270 @@ def main():
             if args.commit:
                 print("")
                 input("After the agent has updated the docs and you're happy with the changes, press Enter here to commit & push")
-                commit_session(project_root, args.remote)
+                commit_session(project_root, args.remote, push_timeout=args.push_timeout,
+                               push_retries=args.push_retries, wait=args.push_wait)
+            return
+        if args.session_command == "push":
+            push_session(project_root, args.remote, args.branch, timeout=args.timeout, retries=args.retries)
             return
 
-    invocation_root = Path(args.root).resolve()
+    if args.command == "fanout":
+        missing = [r for r in args.roots if not os.path.isdir(r)]
+        if missing:
+            print(f"Not a directory: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(2)
+        from .fanout import discover_project_roots, run_fanout
 
-    # Tool root is where this package lives (templates/config shipped with kit).
-    tool_root = Path(__file__).resolve().parent
+        base = Path(args.discover or os.path.commonpath([os.path.abspath(r) for r in args.roots])).resolve()
+        roots = sorted({Path(r).resolve() for r in args.roots} | set(discover_project_roots(base) if args.discover else []))
+        if not roots:
+            print(f"No project roots given or found (looked for docs/PROJECT_CONTEXT.md under {base}).", file=sys.stderr)
+            sys.exit(2)
+        if run_fanout(roots, base, tool_root, args):
+            sys.exit(1)
+        return
 
-    project_root = find_project_root(invocation_root)
+    pack_stats = PackStats()
+    with collecting(pack_stats):
+        started = perf_counter()
+        project_root = discover_project_root(args.root)
+        record_stage("discovery", started)
 
-    cfg = load_config(project_root, tool_root, args.config)
+    if args.command == "batch":
+        config_path = str(Path(args.config).resolve()) if args.config else None
+        try:
+            failures = run_batch(project_root, tool_root, args.jobs, config_path, args.workers)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read batch jobs: {e}", file=sys.stderr)
+            sys.exit(2)
+        if failures:
+            sys.exit(1)
+        return
 
+    if args.command == "packs":
+        run_packs(args, project_root, tool_root)
+        return
+
+    if args.command == "cache":
+        cfg = load_config(project_root, tool_root, args.config)
+        try:
+            cache = open_disk_cache(project_root, cfg)
+        except ValueError as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(2)
+        if args.cache_command == "clear":
+            print(f"Removed {cache.clear()} cache entries from {cache.root}")
+        else:
+            stats = cache.stats()
+            for key in ("path", "entries", "bytes", "max_bytes"):
+                print(f"{key}: {stats[key]}")
+        return
+
+    if args.command == "serve":
+        try:
+            serve_daemon(project_root, tool_root, args.host, args.port)
+        except (OSError, RuntimeError) as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(1)
+        return
+
+    with collecting(pack_stats):
+        try:
+            run_role(args, project_root, tool_root, pack_stats)
+        except ValueError as e:
+            # Config mistakes (unknown cache_backend, unreadable tokenizer.vocab_file, ...).
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(2)
+
+def read_role_inputs(args, project_root: Path, cfg: Dict) -> Tuple[Optional[str], Optional["DiffSummary"]]:
+    """(fenced selection, diff summary) for a `role` invocation."""
+    selection = read_optional_input(args.selection_file, project_root=project_root, label="Selection",
+                                    max_chars=input_char_cap(cfg))
+    if args.diff_from or args.staged:
+        configure_disk_cache(project_root, cfg)
+        diff_text = git_diff_summary(project_root, cfg, rev=args.diff_from, staged=args.staged, selection=selection)
+    else:
+        diff_text = read_diff_input(args.diff, project_root=project_root, cfg=cfg, selection=selection)
+    return selection, diff_text
+
+def run_role(args, project_root: Path, tool_root: Path, pack_stats: PackStats) -> None:
+    if args.watch:
+        watch_role(args, project_root, tool_root)
+        return
     try:
-        selection = read_optional_input(args.selection_file, project_root=project_root, label="Selection")
-        diff_text = read_optional_input(args.diff, project_root=project_root, label="Diff")
+        started = perf_counter()
+        cfg = load_config(project_root, tool_root, args.config)
+        record_stage("config", started)
+        started = perf_counter()
+        selection, diff_text = read_role_inputs(args, project_root, cfg)
+        record_stage("inputs", started)
     except FileNotFoundError as e:
         print(str(e), file=sys.stderr)
-        print("\nTip: generate a diff file with `git diff > patch.diff` and pass `--diff patch.diff`, or use `--diff -` to pipe stdin.", file=sys.stderr)
+        print("\nTip: use `--staged` or `--diff-from <rev>` to read the diff from git directly, or `--diff -` to pipe stdin.", file=sys.stderr)
+        sys.exit(2)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
         sys.exit(2)
 
-    role_prompt, agent_path = load_role_prompt(project_root, tool_root, args.role)
+    config_path = str(Path(args.config).resolve()) if args.config else None
+    incremental = args.incremental or bool(cfg.get("incremental", False))
+    if incremental:
+        configure_section_store(project_root)
+    if not args.no_daemon and not args.profile_startup and not incremental:
+        from .daemon import request_pack
+        reply = request_pack(project_root, {
+            "role": args.role, "instruction": args.instruction, "config": config_path,
+            "selection": selection,
+            "diff_summary": diff_text.to_dict() if diff_text is not None else None,
+        })
+        if reply is not None and "pack" in reply:
+            from .render import Pack
+            pack_stats.merge(reply.get("stats", {}))
+            pack = Pack.from_dict(reply["pack"])
+            write_output(pack, args.format, args.output)
+            if args.store or pack_store_enabled(cfg):
+                store_pack(project_root, cfg, pack, args.instruction)
+            report_stats(args, pack_stats, reply.get("budget_report", []))
+            return
+
+    report: List[Dict] = []
+    pack = render_role_pack(project_root, tool_root, config_path, args.role, args.instruction, selection, diff_text,
+                            cfg=cfg, budget_report=report)
+    write_output(pack, args.format, args.output)
+    if args.store or pack_store_enabled(cfg):
+        store_pack(project_root, cfg, pack, args.instruction)
+    report_stats(args, pack_stats, report)
+
+def watch_role(args, project_root: Path, tool_root: Path) -> None:
+    """Rebuild the pack whenever docs/, the selection or the config change, keeping it written to a file.
+
+    The file is replaced atomically, so a reader (e.g. an editor extension)
+    always sees a complete pack.
+    """
+    global _warm_cache
+    import io
+    from datetime import datetime
+    from .cache import WarmCache, atomic_write_bytes, ensure_state_dir
+    from .render import write_pack
+    from .watch import changes, snapshot
+
+    if args.diff == "-" or args.selection_file == "-":
+        print("--watch cannot re-read stdin; pass --diff/--selection-file as files.", file=sys.stderr)
+        sys.exit(2)
+    _warm_cache = WarmCache()
+    configure_section_store(project_root)
+    if args.output:
+        dest = Path(args.output)
+    else:
+        dest = ensure_state_dir(project_root) / ("pack.md" if args.format == "text" else "pack.json")
+    config_path = str(Path(args.config).resolve()) if args.config else None
+
+    def watched() -> Tuple[List[Path], List[Path]]:
+        files = [project_root / "handoffkit.config.json", tool_root / "handoffkit.config.json"]
+        if config_path:
+            files.append(Path(config_path))
+        for path_str in (args.selection_file, args.diff):
+            if path_str:
+                files.append(Path(path_str) if Path(path_str).is_absolute() else project_root / path_str)
+        try:
+            cfg = load_config(project_root, tool_root, args.config)
+        except RuntimeError:
+            cfg = {}
+        for rel in list(cfg.get("baseline_files", [])) + [cfg.get("session_notes_file"), cfg.get("protocol_file")]:
+            if rel:
+                files.append(project_root / rel)
+        if args.staged or args.diff_from:
+            files += [project_root / ".git" / "index", project_root / ".git" / "HEAD"]
+        return files, [project_root / "docs", project_root / ".github" / "agents", tool_root / "templates"]
+
+    print(f"Watching {project_root} (every {args.interval:g}s); writing {dest}. Ctrl-C to stop.", file=sys.stderr)
+    try:
+        for _ in changes(lambda: snapshot(*watched()), args.interval):
+            started = perf_counter()
+            try:
+                with collecting(PackStats()):
+                    cfg = load_config(project_root, tool_root, args.config)
+                    selection, diff_text = read_role_inputs(args, project_root, cfg)
+                    pack = render_role_pack(project_root, tool_root, config_path, args.role, args.instruction,
+                                            selection, diff_text, cfg=cfg)
+            except (FileNotFoundError, RuntimeError, ValueError) as e:
+                print(f"watch: {e}", file=sys.stderr)
+                continue
+            # newline= as a text-mode file would, so this matches `-o` output.
+            out = io.StringIO(newline=os.linesep)
+            write_pack(pack, out, args.format)
+            atomic_write_bytes(dest, out.getvalue().encode("utf-8"))
+            print(f"[{datetime.now():%H:%M:%S}] wrote {dest} in {(perf_counter() - started) * 1000:.1f} ms",
+                  file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
 
-    pack = build_context_pack(
-        project_root, cfg, args.instruction, selection, diff_text,
-        role_name=args.role, role_agent_path=agent_path
-    )
+def write_output(pack: "Pack", fmt: str, dest: Optional[str]) -> None:
+    """Stream the pack to stdout (or `dest`) one section at a time."""
+    from .render import write_pack
+
+    started = perf_counter()
+    if dest and dest != "-":
+        with open(dest, "w", encoding="utf-8") as out:
+            write_pack(pack, out, fmt)
+    else:
+        write_pack(pack, sys.stdout, fmt)
+    record_stage("write", started)
+
+def pack_store_enabled(cfg: Dict) -> bool:
+    return bool((cfg.get("pack_store") or {}).get("enabled", False))
+
+def store_pack(project_root: Path, cfg: Dict, pack: "Pack", instruction: str) -> None:
+    """Archive the pack in .handoffkit/packs (see packstore.py); a failure only warns."""
+    from .packstore import PackStore
+
+    started = perf_counter()
+    try:
+        entry = PackStore(project_root, cfg).put(pack, instruction=instruction, branch=current_branch(project_root))
+    except (OSError, ValueError) as e:
+        print(f"Warning: pack not stored: {e}", file=sys.stderr)
+    else:
+        print(f"Stored pack {entry['id'][:12]}", file=sys.stderr)
+    record_stage("store", started)
+
+def run_packs(args, project_root: Path, tool_root: Path) -> None:
+    """`handoffkit packs list|show|prune|stats`."""
+    from .packstore import PackStore
+
+    store = PackStore(project_root, load_config(project_root, tool_root, args.config))
+    if args.packs_command == "list":
+        entries = store.find(role=args.role, branch=args.branch, since=args.since, until=args.until, limit=args.limit)
+        if args.json:
+            for e in entries:
+                print(json.dumps(e))
+            return
+        for e in entries:
+            print(f"{e['id'][:12]}  {e['created_at']}  {e['role']:<9} {e.get('branch') or '-':<20} "
+                  f"{e.get('tokens', 0):>6}  {e.get('instruction', '')[:60]}")
+    elif args.packs_command == "show":
+        try:
+            pack = store.get(store.resolve(args.pack_id))
+        except (KeyError, ValueError) as e:
+            print(e.args[0], file=sys.stderr)
+            sys.exit(2)
+        write_output(pack, args.format, args.output)
+    elif args.packs_command == "prune":
+        result = store.prune()
+        print(f"Removed {result['packs_removed']} index entries and {result['objects_removed']} objects "
+              f"({result['bytes_freed']} bytes) from {store.root}")
+    else:
+        for key, value in store.stats().items():
+            print(f"{key}: {value}")
 
-    print(role_prompt + "\n\n" + pack)
+def report_stats(args, pack_stats: PackStats, budget_rows: List[Dict]) -> None:
+    if args.budget_report:
+        print_budget_report(budget_rows)
+    if args.profile_startup:
+        print_startup_profile(pack_stats)
+    if args.stats:
+        print_stats(pack_stats)
+    if args.stats_json:
+        write_stats_json(pack_stats, args.stats_json)
 
 if __name__ == "__main__":
     main()
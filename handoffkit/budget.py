@@ -0,0 +1,84 @@
+"""Token budget allocation across pack sections.
+
+Sections are weighted items with a minimum and maximum size. allocate() solves
+the weighted water-filling problem exactly: every section receives
+clamp(level * weight, min, max) for the single `level` that spends the whole
+budget. It is O(n log n) in the number of sections, so it stays far below a
+millisecond even with dozens of sections.
+"""
+from typing import List, NamedTuple, Sequence
+
+from .tokenizer import Tokenizer
+
+TRUNCATION_MARK = "\n…(truncated)…"
+# Only back off to a paragraph/line break if it keeps this share of the cut.
+BOUNDARY_MIN_KEEP = 0.6
+
+class BudgetItem(NamedTuple):
+    title: str
+    max_tokens: int
+    min_tokens: int
+    weight: float
+
+def default_min_tokens(priority: int) -> int:
+    """Floor each section keeps before lower-priority ones give up more."""
+    return 120 if priority >= 60 else 80 if priority >= 35 else 60
+
+def allocate(items: Sequence[BudgetItem], budget: int) -> List[int]:
+    """Integer token allocation per item, summing to `budget` when it can.
+
+    If even the minimums do not fit, every item gets its minimum (the pack
+    overshoots rather than dropping a section entirely).
+    """
+    maxs = [max(0, it.max_tokens) for it in items]
+    mins = [min(max(0, it.min_tokens), mx) for it, mx in zip(items, maxs)]
+    if sum(maxs) <= budget:
+        return maxs
+    if sum(mins) >= budget:
+        return mins
+
+    # f(level) = sum(clamp(level * w, min, max)) is piecewise linear and
+    # non-decreasing; walk its breakpoints keeping f = const + slope * level.
+    events = []
+    for i, it in enumerate(items):
+        if it.weight > 0 and maxs[i] > mins[i]:
+            events.append((mins[i] / it.weight, 0, i))
+            events.append((maxs[i] / it.weight, 1, i))
+    events.sort()
+    const = float(sum(mins))
+    slope = 0.0
+    level = 0.0
+    for at, kind, i in events:
+        if slope > 0 and const + slope * at >= budget:
+            break
+        level = at
+        if kind == 0:
+            const -= mins[i]
+            slope += items[i].weight
+        else:
+            slope -= items[i].weight
+            const += maxs[i]
+    if slope > 0:
+        level = (budget - const) / slope
+
+    alloc = [min(mx, max(mn, int(level * it.weight))) for it, mn, mx in zip(items, mins, maxs)]
+    # Hand out the rounding remainder, heaviest items first.
+    leftover = budget - sum(alloc)
+    for i in sorted(range(len(items)), key=lambda j: -items[j].weight):
+        if leftover <= 0:
+            break
+        extra = min(leftover, maxs[i] - alloc[i])
+        alloc[i] += extra
+        leftover -= extra
+    return alloc
+
+def trim_to_boundary(text: str, max_tokens: int, tokenizer: Tokenizer) -> str:
+    """Cut `text` to at most `max_tokens` (marker included), preferring paragraph/line breaks."""
+    room = max(0, max_tokens - tokenizer.count(TRUNCATION_MARK))
+    cut = tokenizer.truncate(text, room)
+    for sep in ("\n\n", "\n"):
+        i = cut.rfind(sep)
+        if i > 0 and i >= len(cut) * BOUNDARY_MIN_KEEP:
+            cut = cut[:i]
+            break
+    return (cut.rstrip() + TRUNCATION_MARK).strip()
@@ -0,0 +1,384 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Container, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from .stats import record_cache, record_read
+
+T = TypeVar("T")
+
+Signature = Optional[Tuple[int, int]]
+
+def atomic_write_bytes(path: Path, data: bytes, *, unlink_first: bool = False) -> None:
+    """Replace `path` with `data` so that readers see the old or the new file, never a partial one.
+
+    The temp file is named per process and thread, so concurrent writers never
+    share one. Renaming over an existing file makes ext4 (auto_da_alloc) flush
+    the new one to disk first, tens of ms per write. For caches, where a reader
+    that finds no file just misses, `unlink_first` removes the old file first
+    to avoid that. Raises OSError; the temp file is removed on failure.
+    """
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        if unlink_first:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def walk_files(top: Union[Path, str], skip_dirs: Container[str] = ()) -> Iterator[Tuple[str, List[os.DirEntry]]]:
+    """(directory, its file entries) for `top` and every directory below it.
+
+    Hidden entries (.git, .handoffkit, ...) and directories named in
+    `skip_dirs` are skipped, symlinked directories are not followed, and
+    unreadable directories are passed over. Order is unspecified.
+    """
+    stack = [os.fspath(top)]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            continue
+        files = []
+        for e in entries:
+            if e.name.startswith("."):
+                continue
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name not in skip_dirs:
+                        stack.append(e.path)
+                elif e.is_file():
+                    files.append(e)
+            except OSError:
+                continue
+        yield path, files
+
+def file_signature(p: Path) -> Signature:
+    """(mtime_ns, size) for an existing file, None if it is missing."""
+    try:
+        st = os.stat(p)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class WarmCache:
+    """In-memory memo of values derived from files.
+
+    Each entry remembers the signature of every file it was computed from and is
+    recomputed as soon as any of them changes (or appears/disappears), so a
+    long-lived process never serves stale content.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Hashable, Tuple[Tuple[Signature, ...], object]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, paths: Iterable[Path], compute: Callable[[], T]) -> T:
+        paths = list(paths)
+        sigs = tuple(file_signature(p) for p in paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sigs:
+                self.hits += 1
+                record_cache("warm", True)
+                return entry[1]  # type: ignore[return-value]
+        value = compute()
+        record_cache("warm", False)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (sigs, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+STATE_DIR = ".handoffkit"
+CACHE_SUBDIR = "cache"
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+# A hit refreshes an entry's LRU time at most this often, so reads stay reads.
+TOUCH_INTERVAL = 60.0
+# Writes keep a running byte total; every this many, it is re-read from disk
+# (other processes write too).
+EVICT_CHECK_WRITES = 64
+# Eviction goes down to this share of max_bytes, so a full cache is not swept on every write.
+EVICT_LOW_WATER = 0.9
+
+def ensure_state_dir(project_root: Path) -> Path:
+    """Create <project_root>/.handoffkit (git-ignored by its own .gitignore)."""
+    d = project_root / STATE_DIR
+    if not d.is_dir():
+        d.mkdir(parents=True, exist_ok=True)
+        (d / ".gitignore").write_text("*\n", encoding="utf-8")
+    return d
+
+class DiskCache:
+    """On-disk cache of values derived from a single source file.
+
+    Entries are JSON files under <project_root>/.handoffkit/cache, keyed by the
+    source path plus the caller's parameters. A matching (size, mtime) means a
+    hit without touching the source; otherwise the source is read and its
+    sha256 compared, so a touched-but-unchanged file still skips re-deriving.
+    Hits bump the entry file's mtime (at most once per TOUCH_INTERVAL), and
+    writes evict least-recently-used entries once the directory exceeds
+    `max_bytes`. Writes track the directory's size themselves, so only the
+    first write, every EVICT_CHECK_WRITES-th and one that crosses `max_bytes`
+    scan the directory.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes: Optional[int] = None
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_project(cls, project_root: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> "DiskCache":
+        return _shared(project_root / STATE_DIR / CACHE_SUBDIR, max_bytes)
+
+    def _key(self, source: Union[Path, str], params: Hashable) -> str:
+        import json
+
+        return json.dumps([str(source), params], default=str)
+
+    def _entry_path(self, key: str) -> Path:
+        # crc32 and adler32 rather than hashlib: importing hashlib loads OpenSSL,
+        # which costs more than a warm `role` run spends in the cache otherwise.
+        # Entries store their key, so a name collision reads as a miss.
+        import zlib
+
+        data = key.encode("utf-8")
+        name = f"{zlib.crc32(data):08x}{zlib.adler32(data):08x}"
+        return self.root / name[:2] / f"{name}.json"
+
+    def get(self, source: Path, params: Hashable, derive: Callable[[bytes], T]) -> Optional[T]:
+        """Return derive(source bytes), cached; None if `source` does not exist."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        key = self._key(source, params)
+        entry_path = self._entry_path(key)
+        entry, used_at = self._load(entry_path, key)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            self._touch(entry_path, used_at)
+            self.hits += 1
+            record_cache("disk", True)
+            return entry["value"]
+
+        try:
+            data = source.read_bytes()
+        except OSError:
+            return None
+        record_read(source, len(data))
+        import hashlib
+        sha = hashlib.sha256(data).hexdigest()
+        if entry and entry.get("sha256") == sha:
+            value = entry["value"]
+            self.hits += 1
+            record_cache("disk", True)
+        else:
+            value = derive(data)
+            self.misses += 1
+            record_cache("disk", False)
+        self._write_signed(entry_path, st, {
+            "key": key, "source": str(source), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha256": sha, "value": value,
+        })
+        return value
+
+    def get_by_stat(self, source: Path, params: Hashable, derive: Callable[[Path], T]) -> Optional[T]:
+        """Like get(), but validated by (size, mtime) alone and derived from the path.
+
+        For large append-only files where hashing the content would cost as much
+        as re-deriving the value from a streaming reader.
+        """
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        key = self._key(source, params)
+        entry_path = self._entry_path(key)
+        entry, used_at = self._load(entry_path, key)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            self._touch(entry_path, used_at)
+            self.hits += 1
+            record_cache("disk", True)
+            return entry["value"]
+        try:
+            value = derive(source)
+        except OSError:
+            return None
+        self.misses += 1
+        record_cache("disk", False)
+        self._write_signed(entry_path, st, {
+            "key": key, "source": str(source), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha256": None, "value": value,
+        })
+        return value
+
+    def get_value(self, key: Hashable) -> Optional[object]:
+        """Value stored under a plain key by put_value (no source file involved)."""
+        name = self._key("<key>", key)
+        entry_path = self._entry_path(name)
+        entry, used_at = self._load(entry_path, name)
+        if entry is None:
+            self.misses += 1
+            record_cache("disk", False)
+            return None
+        self._touch(entry_path, used_at)
+        self.hits += 1
+        record_cache("disk", True)
+        return entry["value"]
+
+    def put_value(self, key: Hashable, value: object) -> None:
+        name = self._key("<key>", key)
+        self._write(self._entry_path(name), {"key": name, "source": None, "value": value})
+
+    def _load(self, entry_path: Path, key: str) -> Tuple[Optional[Dict], float]:
+        """(entry, its file's mtime), with one open and no separate stat.
+
+        (None, 0.0) if unreadable or stored under a different key.
+        """
+        import json
+
+        try:
+            with open(entry_path, "rb") as f:
+                used_at = os.fstat(f.fileno()).st_mtime
+                entry = json.loads(f.read())
+        except (OSError, ValueError):
+            return None, 0.0
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None, 0.0
+        return entry, used_at
+
+    def _touch(self, entry_path: Path, used_at: float) -> None:
+        if time.time() - used_at < TOUCH_INTERVAL:
+            return
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+    def _write_signed(self, entry_path: Path, st: os.stat_result, entry: Dict) -> None:
+        """_write, unless another process has meanwhile stored an entry for this same source version."""
+        current, _ = self._load(entry_path, entry["key"])
+        if current and current.get("size") == st.st_size and current.get("mtime_ns") == st.st_mtime_ns:
+            return
+        self._write(entry_path, entry)
+
+    def _write(self, entry_path: Path, entry: Dict) -> None:
+        import json
+
+        data = json.dumps(entry).encode("utf-8")
+        try:
+            if not entry_path.parent.is_dir():
+                if self.root.parent.name == STATE_DIR:
+                    ensure_state_dir(self.root.parent.parent)
+                entry_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                replaced = os.stat(entry_path).st_size
+            except OSError:
+                replaced = 0
+            atomic_write_bytes(entry_path, data, unlink_first=True)
+        except OSError:
+            # A read-only checkout should still produce packs, just uncached.
+            return
+        with self._lock:
+            self._writes += 1
+            if self._bytes is not None and self._writes % EVICT_CHECK_WRITES:
+                self._bytes += len(data) - replaced
+                if self._bytes <= self.max_bytes:
+                    return
+        self.evict()
+
+    def _entries(self):
+        if not self.root.is_dir():
+            return []
+        out = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith(".json"):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    out.append((st.st_mtime_ns, st.st_size, e.path))
+        return out
+
+    def evict(self) -> int:
+        """Once over max_bytes, drop least-recently-used entries down to EVICT_LOW_WATER of it.
+
+        Returns the count removed.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            target = int(self.max_bytes * EVICT_LOW_WATER)
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        with self._lock:
+            self._bytes = total
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            self._bytes = None
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        entries = self._entries()
+        return {
+            "path": str(self.root),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+_caches: Dict[str, DiskCache] = {}
+_caches_lock = threading.Lock()
+
+def _shared(root: Path, max_bytes: int) -> DiskCache:
+    """One DiskCache (and so one running size total) per cache directory in this process."""
+    with _caches_lock:
+        cache = _caches.get(str(root))
+        if cache is None:
+            cache = _caches[str(root)] = DiskCache(root, max_bytes)
+        cache.max_bytes = max_bytes
+        return cache
@@ -0,0 +1,150 @@
+"""Local HTTP daemon for `handoffkit serve` and the matching thin client.
+
+The daemon is bound to loopback only and advertises itself through
+`<project_root>/.handoffkit/daemon.json` (pid, port and a random token). The
+client reads that file and silently returns None whenever the daemon cannot be
+reached, so callers can fall back to building the pack in-process.
+"""
+import json
+import os
+import secrets
+import signal
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .cache import STATE_DIR, ensure_state_dir
+
+DAEMON_FILE = "daemon.json"
+CLIENT_TIMEOUT = 10.0
+
+Handler = Callable[[Dict], Dict]
+
+def daemon_file(project_root: Path) -> Path:
+    return project_root / STATE_DIR / DAEMON_FILE
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def _read_daemon_info(project_root: Path) -> Optional[Dict]:
+    p = daemon_file(project_root)
+    try:
+        info = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(info, dict) or not _pid_alive(int(info.get("pid", 0))):
+        return None
+    return info
+
+def _make_request_handler(handler: Handler, token: str):
+    from http.server import BaseHTTPRequestHandler
+
+    class RequestHandler(BaseHTTPRequestHandler):
+        server_version = "handoffkit"
+
+        def _send(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self) -> bool:
+            return secrets.compare_digest(self.headers.get("X-Handoffkit-Token", ""), token)
+
+        def do_GET(self) -> None:
+            if not self._authorized():
+                self._send(403, {"error": "forbidden"})
+            elif self.path == "/health":
+                self._send(200, {"ok": True, "pid": os.getpid()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if not self._authorized():
+                self._send(403, {"error": "forbidden"})
+                return
+            if self.path != "/pack":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                request = json.loads(self.rfile.read(length).decode("utf-8"))
+                self._send(200, handler(request))
+            except FileNotFoundError as e:
+                self._send(404, {"error": str(e), "missing": True})
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, format: str, *args) -> None:
+            # Keep the daemon quiet; editor hooks call it several times a minute.
+            return
+
+    return RequestHandler
+
+def serve(project_root: Path, handler: Handler, *, host: str = "127.0.0.1", port: int = 0) -> None:
+    """Serve `handler` over HTTP until interrupted."""
+    from http.server import ThreadingHTTPServer
+
+    existing = _read_daemon_info(project_root)
+    if existing:
+        raise RuntimeError(f"handoffkit daemon already running for {project_root} (pid {existing['pid']})")
+
+    token = secrets.token_hex(16)
+    httpd = ThreadingHTTPServer((host, port), _make_request_handler(handler, token))
+    httpd.daemon_threads = True
+    ensure_state_dir(project_root)
+    info_path = daemon_file(project_root)
+    info = {"pid": os.getpid(), "host": host, "port": httpd.server_address[1], "token": token}
+    fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+
+    # Let `kill <pid>` unwind through the finally below so daemon.json is removed.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"handoffkit daemon listening on http://{host}:{info['port']} (pid {info['pid']})", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        try:
+            info_path.unlink()
+        except OSError:
+            pass
+
+def request_pack(project_root: Path, request: Dict) -> Optional[Dict]:
+    """Ask a running daemon to build a pack; None if no daemon is reachable."""
+    info = _read_daemon_info(project_root)
+    if not info:
+        return None
+    import http.client
+
+    body = json.dumps(request).encode("utf-8")
+    conn = http.client.HTTPConnection(info["host"], int(info["port"]), timeout=CLIENT_TIMEOUT)
+    try:
+        conn.request("POST", "/pack", body=body, headers={
+            "Content-Type": "application/json",
+            "X-Handoffkit-Token": info.get("token", ""),
+        })
+        resp = conn.getresponse()
+        payload = json.loads(resp.read().decode("utf-8"))
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+    if resp.status == 404 and payload.get("missing"):
+        raise FileNotFoundError(payload["error"])
+    if resp.status != 200:
+        return None
+    return payload
@@ -0,0 +1,398 @@
+"""Diff-aware summarization for the Diff section.
+
+A unified diff is parsed line by line into files and hunks. Every hunk is
+scored by size (amount of change, discounted by length), file type and
+overlap with the --selection-file content;
+lockfiles and generated files only contribute a stat line. Only the best
+hunks are retained while parsing (bounded by `max_chars`), so memory tracks the
+budget rather than the input and the whole pass is linear in the diff size.
+DiffSummary.render then fills a token budget with the most relevant hunks,
+printed in their original order under a one-line stat per file.
+"""
+import heapq
+import math
+import re
+from fnmatch import translate
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from .tokenizer import Tokenizer
+
+DEFAULT_EXCLUDE = (
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "Gemfile.lock", "poetry.lock", "Pipfile.lock", "Cargo.lock", "composer.lock", "go.sum",
+    "*.min.js", "*.min.css", "*.map", "vscode.d.ts", "*.generated.*", "*_pb2.py", "*.pb.go",
+)
+
+SOURCE_EXT = {
+    ".py", ".rb", ".ts", ".tsx", ".js", ".jsx", ".go", ".rs", ".java", ".kt", ".c", ".h", ".cc",
+    ".cpp", ".hpp", ".cs", ".swift", ".php", ".scala", ".sh", ".sql", ".erb", ".vue", ".svelte",
+}
+DOC_EXT = {".md", ".rst", ".txt", ".adoc"}
+CONFIG_EXT = {".json", ".yml", ".yaml", ".toml", ".ini", ".cfg", ".xml", ".lock", ".env"}
+
+# Lines this short ("end", "}", "") say nothing about overlap with the selection.
+MIN_OVERLAP_LINE = 8
+# A single physical line longer than this is cut (minified files, data blobs).
+MAX_LINE_CHARS = 4096
+# "index", mode, rename and ---/+++ lines; anything beyond this is noise.
+MAX_HEADER_LINES = 8
+# Smallest useful slice of a hunk that does not fit whole.
+MIN_PARTIAL_TOKENS = 48
+HUNK_CUT_MARK = "\n…(hunk truncated)…"
+# Share of a render budget the per-file stat lines may use.
+STAT_SHARE = 0.25
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+# Combined diffs (`git diff` during a merge conflict): one "-" range per parent.
+_COMBINED_HEADER = re.compile(r"^(@@@+) ((?:-\d+(?:,\d+)? )+)\+\d+(?:,(\d+))? \1")
+_COMBINED_RANGE = re.compile(r"-\d+(?:,(\d+))?")
+
+class Hunk(NamedTuple):
+    seq: int
+    file_index: int
+    score: float
+    text: str
+
+class DiffFile:
+    __slots__ = ("path", "header", "adds", "dels", "hunks", "binary", "excluded")
+
+    def __init__(self) -> None:
+        self.path = ""
+        self.header: List[str] = []
+        self.adds = 0
+        self.dels = 0
+        self.hunks = 0
+        self.binary = False
+        self.excluded = False
+
+def file_weight(path: str) -> float:
+    lower = path.lower()
+    name = lower.rsplit("/", 1)[-1]
+    ext = "." + name.rsplit(".", 1)[-1] if "." in name else ""
+    if "/test" in "/" + lower or "/spec/" in "/" + lower or name.startswith("test_") \
+            or name.endswith(("_test.py", "_spec.rb", ".test.ts", ".test.js", ".spec.ts", ".spec.js")):
+        return 0.8
+    if ext in SOURCE_EXT:
+        return 1.0
+    if ext in DOC_EXT:
+        return 0.6
+    if ext in CONFIG_EXT:
+        return 0.5
+    return 0.7
+
+def exclude_matcher(patterns: Sequence[str]):
+    """Predicate matching a path whose basename or full path fits any glob."""
+    if not patterns:
+        return lambda path: False
+    rx = re.compile("|".join(f"(?:{translate(p)})" for p in patterns))
+    return lambda path: bool(rx.match(path.rsplit("/", 1)[-1]) or rx.match(path))
+
+def _path_from(line: str, prefix: str) -> str:
+    path = line[len(prefix):].split("\t", 1)[0].strip()
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+class DiffSummary:
+    def __init__(self, files: List[DiffFile], hunks: List[Hunk], preamble: str, dropped: int) -> None:
+        self.files = files
+        self.hunks = sorted(hunks, key=lambda h: h.seq)
+        self.preamble = preamble
+        # Hunks evicted while parsing because the retention cap was reached.
+        self.dropped = dropped
+
+    @property
+    def is_diff(self) -> bool:
+        return bool(self.files)
+
+    def _stat_lines(self) -> List[str]:
+        lines = []
+        for f in self.files:
+            if f.binary:
+                detail = "binary"
+            elif f.excluded:
+                detail = f"+{f.adds} -{f.dels} (skipped: generated/lockfile)"
+            else:
+                detail = f"+{f.adds} -{f.dels} ({f.hunks} hunk{'s' if f.hunks != 1 else ''})"
+            lines.append(f" {f.path} | {detail}")
+        return lines
+
+    def render(self, max_tokens: Optional[int], tokenizer: Tokenizer) -> str:
+        """Stat lines plus the most relevant hunks that fit in `max_tokens` (None: all retained)."""
+        if not self.is_diff:
+            text = self.preamble.strip()
+            if max_tokens is not None and tokenizer.count(text) > max_tokens:
+                text = tokenizer.truncate(text, max_tokens)
+            return text
+
+        total_hunks = sum(f.hunks for f in self.files if not f.excluded)
+        adds = sum(f.adds for f in self.files)
+        dels = sum(f.dels for f in self.files)
+
+        def summary_line(shown: int) -> str:
+            return (f"{len(self.files)} file{'s' if len(self.files) != 1 else ''} changed, +{adds} -{dels}; "
+                    f"showing {shown} of {total_hunks} hunks")
+
+        stats = self._stat_lines()
+        if max_tokens is None:
+            chosen = self.hunks
+        else:
+            budget = max_tokens - tokenizer.count(summary_line(total_hunks))
+            # +1 per part for the newline that joins it to the rest.
+            stat_counts = [n + 1 for n in tokenizer.count_many(stats)] if stats else []
+            stat_budget = int(budget * STAT_SHARE)
+            used = 0
+            for i, n in enumerate(stat_counts):
+                if used + n > stat_budget:
+                    stats = stats[:i] + [f" … and {len(stats) - i} more files"]
+                    used += tokenizer.count(stats[-1])
+                    break
+                used += n
+            budget -= used
+
+            by_score = sorted(self.hunks, key=lambda h: (-h.score, h.seq))
+            hunk_counts = [n + 1 for n in tokenizer.count_many([h.text for h in by_score])] if by_score else []
+            header_cost: Dict[int, int] = {}
+            chosen = []
+            skipped = []
+
+            def header_tokens(h: Hunk) -> int:
+                if h.file_index in header_cost:
+                    return 0
+                return tokenizer.count("\n".join(self.files[h.file_index].header)) + 2
+
+            # Whole hunks first, most relevant first; then the best hunk that did
+            # not fit gets whatever room is left, if that is still worth reading.
+            for h, n in zip(by_score, hunk_counts):
+                header = header_tokens(h)
+                if header + n > budget:
+                    skipped.append(h)
+                    continue
+                budget -= header + n
+                header_cost[h.file_index] = header
+                chosen.append(h)
+            for h in skipped:
+                header = header_tokens(h)
+                room = budget - header - tokenizer.count(HUNK_CUT_MARK)
+                if room < MIN_PARTIAL_TOKENS:
+                    continue
+                head = tokenizer.truncate(h.text, room)
+                head = head[:head.rfind("\n")] if "\n" in head else head
+                h = h._replace(text=head + HUNK_CUT_MARK)
+                budget -= header + tokenizer.count(h.text)
+                header_cost[h.file_index] = header
+                chosen.append(h)
+            chosen.sort(key=lambda h: h.seq)
+
+        out = [summary_line(len(chosen))] + stats
+        current = -1
+        for h in chosen:
+            if h.file_index != current:
+                current = h.file_index
+                out.append("")
+                out.extend(self.files[current].header)
+            out.append(h.text)
+        return "\n".join(out).strip()
+
+    def to_dict(self) -> Dict:
+        return {
+            "files": [{k: getattr(f, k) for k in DiffFile.__slots__} for f in self.files],
+            "hunks": [list(h) for h in self.hunks],
+            "preamble": self.preamble,
+            "dropped": self.dropped,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DiffSummary":
+        files = []
+        for fd in data["files"]:
+            f = DiffFile()
+            for k in DiffFile.__slots__:
+                setattr(f, k, fd[k])
+            files.append(f)
+        return cls(files, [Hunk(*h) for h in data["hunks"]], data["preamble"], data["dropped"])
+
+def _read_lines(stream) -> Iterable[str]:
+    """Lines without their newline, each cut to MAX_LINE_CHARS without buffering the rest."""
+    while True:
+        line = stream.readline(MAX_LINE_CHARS)
+        if not line:
+            return
+        if line.endswith("\n"):
+            yield line[:-1]
+            continue
+        # Over-long (or final) line: drain the remainder in bounded reads.
+        rest = line
+        cut = False
+        while not rest.endswith("\n"):
+            rest = stream.readline(MAX_LINE_CHARS)
+            if not rest:
+                break
+            cut = True
+        yield line + ("…" if cut else "")
+
+def summarize_diff(stream, *, selection: Optional[str] = None, max_chars: Optional[int] = None,
+                   exclude: Sequence[str] = DEFAULT_EXCLUDE) -> DiffSummary:
+    """Parse a unified diff from a text stream, retaining at most ~max_chars of hunks."""
+    is_excluded = exclude_matcher(exclude)
+    wanted = set()
+    if selection:
+        wanted = {ln.strip() for ln in selection.splitlines() if len(ln.strip()) >= MIN_OVERLAP_LINE}
+
+    files: List[DiffFile] = []
+    kept: Dict[int, Hunk] = {}
+    heap: List = []
+    kept_chars = 0
+    dropped = 0
+    preamble: List[str] = []
+    preamble_chars = 0
+
+    cur: Optional[DiffFile] = None
+    body: List[str] = []
+    body_chars = 0
+    old_left = new_left = 0
+    # Columns of line prefix: 1 in a unified diff, one per parent in a combined one.
+    parents = 1
+    parent_left: List[int] = []
+    in_hunk = False
+    overlap = 0
+    changed = 0
+    seq = 0
+
+    def finish_hunk() -> None:
+        nonlocal in_hunk, kept_chars, dropped, seq
+        in_hunk = False
+        if cur is None or cur.excluded or not body:
+            return
+        n_lines = max(1, len(body) - 1)
+        text = "\n".join(body)
+        if max_chars is not None and len(text) > max_chars:
+            text = text[:max_chars] + HUNK_CUT_MARK
+        # Relevance grows with the amount of change, but the score is per
+        # (square root of) size so one huge hunk cannot crowd out many medium ones.
+        relevance = file_weight(cur.path) * (1.0 + math.log2(1 + changed)) * (1.0 + 2.0 * overlap / n_lines)
+        score = relevance / math.sqrt(1.0 + len(text) / 80.0)
+        seq += 1
+        h = Hunk(seq, len(files) - 1, score, text)
+        kept[seq] = h
+        heapq.heappush(heap, (score, -seq))
+        kept_chars += len(text)
+        while max_chars is not None and kept_chars > max_chars and heap:
+            _, neg = heapq.heappop(heap)
+            victim = kept.pop(-neg)
+            kept_chars -= len(victim.text)
+            dropped += 1
+
+    def start_file() -> DiffFile:
+        f = DiffFile()
+        files.append(f)
+        return f
+
+    for line in _read_lines(stream):
+        if in_hunk:
+            tag = line[:1]
+            if tag == "\\":
+                # "\ No newline at end of file" belongs to the line before it,
+                # even when that line was the hunk's last.
+                if max_chars is None or body_chars <= max_chars:
+                    body.append(line)
+                    body_chars += len(line) + 1
+                continue
+            if old_left > 0 or new_left > 0:
+                if parents == 1:
+                    counted = tag in (" ", "", "-", "+")
+                    if not counted:
+                        pass
+                    elif tag == "-":
+                        old_left -= 1
+                        cur.dels += 1
+                        changed += 1
+                    elif tag == "+":
+                        new_left -= 1
+                        cur.adds += 1
+                        changed += 1
+                    else:
+                        old_left -= 1
+                        new_left -= 1
+                else:
+                    # One column per parent: "-" not in the result, "+" not in that parent.
+                    cols = line[:parents].ljust(parents)
+                    counted = not cols.strip(" +-")
+                    if counted:
+                        if "-" in cols:
+                            cur.dels += 1
+                            changed += 1
+                        else:
+                            new_left -= 1
+                        if "+" in cols:
+                            cur.adds += 1
+                            changed += 1
+                        for i, c in enumerate(cols):
+                            if c != "+":
+                                parent_left[i] -= 1
+                        old_left = max(parent_left)
+                if counted:
+                    if wanted and line[parents:].strip() in wanted:
+                        overlap += 1
+                    if max_chars is None or body_chars <= max_chars:
+                        body.append(line)
+                        body_chars += len(line) + 1
+                    continue
+            finish_hunk()
+
+        if line.startswith(("diff --cc ", "diff --combined ")):
+            cur = start_file()
+            cur.path = line.split(" ", 2)[2]
+            cur.header.append(line)
+            cur.excluded = is_excluded(cur.path)
+        elif line.startswith("diff --git "):
+            cur = start_file()
+            cur.path = line.rsplit(" b/", 1)[-1] if " b/" in line else line[len("diff --git "):]
+            cur.header.append(line)
+            cur.excluded = is_excluded(cur.path)
+        elif line.startswith("--- ") and (cur is None or cur.hunks or any(h.startswith("--- ") for h in cur.header)):
+            # Plain `diff -u` output has no "diff --git" line between files.
+            cur = start_file()
+            cur.path = _path_from(line, "--- ")
+            cur.header.append(line)
+            cur.excluded = is_excluded(cur.path)
+        elif cur is not None and line.startswith("+++ "):
+            path = _path_from(line, "+++ ")
+            if path != "/dev/null":
+                cur.path = path
+            cur.header.append(line)
+            cur.excluded = is_excluded(cur.path)
+        elif cur is not None and line.startswith("--- "):
+            if not cur.path:
+                cur.path = _path_from(line, "--- ")
+            cur.header.append(line)
+        elif cur is not None and line.startswith("@@"):
+            combined = _COMBINED_HEADER.match(line) if line.startswith("@@@") else None
+            if combined:
+                parents = len(combined.group(1)) - 1
+                parent_left = [int(n) if n is not None else 1 for n in _COMBINED_RANGE.findall(combined.group(2))]
+                old_left = max(parent_left)
+                new_left = int(combined.group(3)) if combined.group(3) is not None else 1
+            else:
+                m = _HUNK_HEADER.match(line)
+                parents = 1
+                old_left = int(m.group(1)) if m and m.group(1) is not None else 1
+                new_left = int(m.group(2)) if m and m.group(2) is not None else 1
+            cur.hunks += 1
+            body = [line]
+            body_chars = len(line) + 1
+            overlap = changed = 0
+            # The hunk stays open past its last counted line, for a trailing "\" line.
+            in_hunk = True
+        elif cur is not None:
+            if line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+                cur.binary = True
+            if len(cur.header) < MAX_HEADER_LINES:
+                cur.header.append(line)
+        elif max_chars is None or preamble_chars <= max_chars:
+            preamble.append(line)
+            preamble_chars += len(line) + 1
+
+    if in_hunk:
+        finish_hunk()
+    return DiffSummary(files, list(kept.values()), "\n".join(preamble), dropped)
@@ -0,0 +1,132 @@
+"""One scan object per document for everything the pack builder asks of its text.
+
+Frontmatter bounds, the SUMMARY_START/SUMMARY_END block, the longest backtick
+run and line offsets are each found at most once per document, on first use,
+and only with C-level primitives (no per-character or per-line Python loop):
+
+- frontmatter: one regex anchored at the start, so it never reads past the
+  closing --- line;
+- summary markers: two str.find calls;
+- longest backtick run: `"`" * n in text` probes for the usual short runs,
+  then one regex pass that matches only the runs longer than those;
+- line offsets: from str.splitlines. tail() of a long document does without
+  them: it steps back from the end with str.rfind, so its cost follows the
+  size of the tail rather than the document.
+
+Helpers that need several of these share one DocScan instead of each walking
+the text again.
+"""
+import re
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+SUMMARY_START = "<!-- SUMMARY_START -->"
+SUMMARY_END = "<!-- SUMMARY_END -->"
+# Runs up to this long are found by substring probes; longer ones by a regex pass.
+PROBE_RUNS = 3
+
+# Below this, splitting the whole text is cheaper than stepping back line by line.
+SHORT_TEXT_CHARS = 16 * 1024
+
+_FRONTMATTER = re.compile(r"\A---[^\S\n]*\n(.*?)^(?:---|\.\.\.)[^\S\n]*$\n?", re.S | re.M)
+_LONG_RUNS = {}
+# Line boundaries str.splitlines() knows besides "\n".
+_OTHER_BREAKS = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85  ]")
+_UNSET = object()
+
+def longest_run(text: str, ch: str) -> int:
+    """Length of the longest run of `ch` in `text`."""
+    n = 0
+    while n < PROBE_RUNS:
+        if ch * (n + 1) not in text:
+            return n
+        n += 1
+    pattern = _LONG_RUNS.get(ch)
+    if pattern is None:
+        pattern = _LONG_RUNS[ch] = re.compile(f"{re.escape(ch)}{{{PROBE_RUNS + 1},}}")
+    return max(map(len, pattern.findall(text)), default=n)
+
+class DocScan:
+    __slots__ = ("text", "_frontmatter", "_summary", "_ticks", "_line_starts")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._frontmatter = _UNSET
+        self._summary = _UNSET
+        self._ticks: Optional[int] = None
+        self._line_starts: Optional[List[int]] = None
+
+    @property
+    def frontmatter(self) -> Optional[Tuple[int, int, int]]:
+        """(start, end) of the frontmatter source between the --- lines, then where the body starts."""
+        if self._frontmatter is _UNSET:
+            m = _FRONTMATTER.match(self.text)
+            self._frontmatter = (m.start(1), m.end(1), m.end()) if m else None
+        return self._frontmatter  # type: ignore[return-value]
+
+    @property
+    def summary(self) -> Optional[Tuple[int, int]]:
+        """(start, end) of the text between the first SUMMARY_START and the first SUMMARY_END."""
+        if self._summary is _UNSET:
+            s = self.text.find(SUMMARY_START)
+            e = self.text.find(SUMMARY_END) if s != -1 else -1
+            self._summary = (s + len(SUMMARY_START), e) if s != -1 and e > s else None
+        return self._summary  # type: ignore[return-value]
+
+    @property
+    def longest_tick_run(self) -> int:
+        if self._ticks is None:
+            self._ticks = longest_run(self.text, "`")
+        return self._ticks
+
+    @property
+    def line_starts(self) -> List[int]:
+        """Offset of each line (as str.splitlines counts lines)."""
+        if self._line_starts is None:
+            self._line_starts = [0, *accumulate(map(len, self.text.splitlines(True)))][:-1] if self.text else []
+        return self._line_starts
+
+    def frontmatter_text(self) -> Optional[str]:
+        fm = self.frontmatter
+        return self.text[fm[0]:fm[1]] if fm else None
+
+    def body(self) -> str:
+        fm = self.frontmatter
+        return self.text[fm[2]:] if fm else self.text
+
+    def summary_text(self) -> Optional[str]:
+        """The stripped summary block, None if the document has none."""
+        span = self.summary
+        return self.text[span[0]:span[1]].strip() if span else None
+
+    def tail(self, max_lines: int) -> str:
+        """The last `max_lines` lines, stripped (the whole text, stripped, if it is that short)."""
+        text = self.text
+        if len(text) <= SHORT_TEXT_CHARS:
+            lines = text.splitlines()
+            if len(lines) <= max_lines:
+                return text.strip()
+            return "\n".join(lines[-max_lines:]).strip()
+        if max_lines > 0 and self._line_starts is None:
+            # Step back over max_lines "\n"-terminated lines. That is what
+            # splitlines() would give as long as the stretch walked over has
+            # no other line breaks (a final "\n" does not open a new line).
+            pos = len(text) - 1 if text.endswith("\n") else len(text)
+            for _ in range(max_lines):
+                pos = text.rfind("\n", 0, pos)
+                if pos < 0:
+                    break
+            if not _OTHER_BREAKS.search(text, max(pos, 0)):
+                return text[pos + 1:].strip()
+        starts = self.line_starts
+        if len(starts) <= max_lines:
+            return text.strip()
+        # The index lines[-max_lines:] would start at (max_lines <= 0 keeps it all, as tail_lines always has).
+        first = len(starts) - max_lines if max_lines > 0 else -max_lines
+        if first >= len(starts):
+            return ""
+        # Re-split only the tail so separators come out as "\n", as a join of splitlines() would.
+        return "\n".join(text[starts[first]:].splitlines()).strip()
+
+def scan(text: str) -> DocScan:
+    return DocScan(text)
@@ -0,0 +1,103 @@
+"""`handoffkit fanout`: one role pack per project of a monorepo, built on a process pool.
+
+The pool's worker lives here rather than in __main__ so that it can be
+imported by name in a child process: with the spawn and forkserver start
+methods (the default on macOS and Windows, and on Linux from Python 3.14) a
+function defined in the __main__ of `python -m handoffkit` cannot be found.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+from .cache import ensure_state_dir, walk_files
+
+FANOUT_SKIP_DIRS = {"node_modules", "vendor", "__pycache__"}
+FANOUT_SUBDIR = "fanout"
+
+def discover_project_roots(base: Path) -> List[Path]:
+    """Every directory under `base` (inclusive) that has docs/PROJECT_CONTEXT.md, sorted."""
+    return sorted(Path(d) for d, _ in walk_files(os.path.abspath(base), FANOUT_SKIP_DIRS)
+                  if os.path.isfile(os.path.join(d, "docs", "PROJECT_CONTEXT.md")))
+
+def build_project(job: Dict) -> Dict:
+    """Build one project's pack and write it to job["output"] (runs in a pool process)."""
+    from .__main__ import render_role_pack
+    from .render import write_pack
+
+    started = perf_counter()
+    result: Dict = {"root": job["root"], "output": job["output"]}
+    try:
+        report: List[Dict] = []
+        pack = render_role_pack(Path(job["root"]), Path(job["tool_root"]), job["config"], job["role"],
+                                job["instruction"], None, None, budget_report=report)
+        with open(job["output"], "w", encoding="utf-8") as out:
+            write_pack(pack, out, job["format"])
+        result["tokens"] = sum(row["kept"] for row in report)
+        result["sections"] = [{"title": row["title"], "kept": row["kept"]} for row in report]
+    except (OSError, RuntimeError, ValueError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["ms"] = round((perf_counter() - started) * 1000, 2)
+    return result
+
+def run_fanout(roots: List[Path], base: Path, tool_root: Path, args) -> int:
+    """Build one pack per project root on a process pool; write them plus index.json/index.md.
+
+    Returns the number of projects that failed.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from datetime import datetime
+
+    if args.out_dir:
+        out_dir = Path(args.out_dir)
+    else:
+        out_dir = ensure_state_dir(base) / FANOUT_SUBDIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ext = ".md" if args.format == "text" else ".json"
+    config_path = str(Path(args.config).resolve()) if args.config else None
+    jobs = []
+    for root in roots:
+        rel = os.path.relpath(root, base)
+        slug = "root" if rel == "." else rel.replace(os.sep, "__")
+        jobs.append({
+            "root": str(root), "rel": Path(rel).as_posix(), "output": str(out_dir / f"{slug}{ext}"),
+            "tool_root": str(tool_root), "config": config_path, "role": args.role,
+            "instruction": args.instruction, "format": args.format,
+        })
+
+    results: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(build_project, job): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:  # a crashed worker should not lose the other projects
+                result = {"root": job["root"], "output": job["output"], "error": f"{type(e).__name__}: {e}"}
+            result["project"] = job["rel"]
+            status = f"error: {result['error']}" if "error" in result else f"{result['tokens']} tokens in {result['ms']} ms"
+            print(f"{job['rel']}: {status}", file=sys.stderr)
+            results.append(result)
+    results.sort(key=lambda r: r["project"])
+    failed = [r["project"] for r in results if "error" in r]
+
+    index = {
+        "role": args.role, "instruction": args.instruction, "format": args.format,
+        "generated_at": datetime.now().isoformat(timespec="seconds"), "base": str(base), "projects": results,
+    }
+    (out_dir / "index.json").write_text(json.dumps(index, indent=2) + "\n", encoding="utf-8")
+    lines = [f"# handoffkit packs – {args.role}: {args.instruction}", "",
+             "| Project | Pack | Tokens | Time (ms) |", "|---|---|---|---|"]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| {r['project']} | – | {r['error']} | {r.get('ms', '')} |")
+        else:
+            lines.append(f"| {r['project']} | [{Path(r['output']).name}]({Path(r['output']).name}) | {r['tokens']} | {r['ms']} |")
+    (out_dir / "index.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print(f"Wrote {len(results) - len(failed)} of {len(results)} packs and index.json/index.md to {out_dir}",
+          file=sys.stderr)
+    if failed:
+        print(f"Failed ({len(failed)}): {', '.join(failed)}", file=sys.stderr)
+    return len(failed)
@@ -0,0 +1,203 @@
+"""Session-end commit and push as an asyncio pipeline.
+
+    add docs ──┬── rev-parse (branch) ──┐
+               ├── diff --cached ───────┼── commit ── push (background)
+               └── status ──────────────┘
+
+The three queries after `git add` are independent, so they run concurrently.
+The push is handed to a detached `handoffkit session push` process. That
+process retries with backoff, kills any attempt that exceeds its timeout, and
+writes its progress to <project_root>/.handoffkit/push-status.json, which an
+editor extension can poll:
+
+    {"state": "running" | "retrying" | "succeeded" | "failed",
+     "remote": "origin", "branch": "main", "attempt": 1, "max_attempts": 3,
+     "pid": 1234, "started_at": "...", "updated_at": "...",
+     "elapsed_ms": 812.4, "error": null}
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional
+
+from .cache import STATE_DIR, atomic_write_bytes, ensure_state_dir
+
+DOC_PATHS = ["docs/PROJECT_CONTEXT.md", "docs/NOW.md", "docs/SESSION_NOTES.md"]
+STATUS_FILE = "push-status.json"
+LOG_FILE = "push.log"
+DEFAULT_PUSH_TIMEOUT = 60.0
+DEFAULT_PUSH_RETRIES = 2
+RETRY_BACKOFF = 2.0  # seconds before the first retry, doubled for each further one
+
+class GitResult(NamedTuple):
+    returncode: int
+    stdout: str
+    stderr: str
+
+    def details(self) -> str:
+        return self.stderr.strip() or self.stdout.strip()
+
+class Timings:
+    """Wall time per pipeline stage, printed as one line at the end."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, started: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + perf_counter() - started
+
+    def line(self) -> str:
+        parts = "  ".join(f"{name} {s * 1000:.1f}" for name, s in self.stages.items())
+        return f"stages (ms): {parts}  (total {sum(self.stages.values()) * 1000:.1f})"
+
+async def git(args: List[str], cwd: Path, *, timeout: Optional[float] = None,
+              env: Optional[Dict[str, str]] = None) -> GitResult:
+    """Run git asynchronously; on timeout the process is killed and TimeoutError raised."""
+    # In its own process group, so a timeout also kills ssh / remote helpers git started.
+    group = {"start_new_session": True} if timeout is not None and os.name != "nt" else {}
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "git", *args, cwd=str(cwd), env=env,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            **group,
+        )
+    except FileNotFoundError:
+        raise RuntimeError("git not found on PATH")
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        if group:
+            import signal
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        else:
+            proc.kill()
+        await proc.wait()
+        raise TimeoutError(f"git {' '.join(args)} timed out after {timeout:g}s")
+    return GitResult(proc.returncode, out.decode("utf-8", errors="replace"), err.decode("utf-8", errors="replace"))
+
+async def git_checked(args: List[str], cwd: Path) -> str:
+    result = await git(args, cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.details()}")
+    return result.stdout
+
+def unstaged_non_doc_paths(status: str, committed: bool) -> List[str]:
+    """Non-doc paths `git status --porcelain` (taken before the commit) leaves dirty after it.
+
+    Entries that are only staged go into the commit, so once it has been made
+    just the worktree column (and untracked files) matter.
+    """
+    paths = []
+    for line in status.splitlines():
+        if len(line) < 4 or (committed and line[1] == " "):
+            continue
+        path = line[3:]
+        if " -> " in path:
+            path = path.split(" -> ", 1)[1]
+        if not path.startswith("docs/"):
+            paths.append(path)
+    return paths
+
+async def commit_docs(project_root: Path, timings: Timings) -> Dict[str, object]:
+    """Stage and commit the session docs; returns {"branch", "committed", "other_paths"}."""
+    started = perf_counter()
+    await git_checked(["add", *DOC_PATHS], project_root)
+    timings.add("add", started)
+
+    started = perf_counter()
+    branch, staged, status = await asyncio.gather(
+        git_checked(["rev-parse", "--abbrev-ref", "HEAD"], project_root),
+        git_checked(["diff", "--cached", "--name-only"], project_root),
+        git_checked(["status", "--porcelain"], project_root),
+    )
+    timings.add("query", started)
+
+    committed = bool(staged.strip())
+    if committed:
+        started = perf_counter()
+        message = f"Session notes update - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        await git_checked(["commit", "-m", message], project_root)
+        timings.add("commit", started)
+    return {"branch": branch.strip(), "committed": committed,
+            "other_paths": unstaged_non_doc_paths(status, committed)}
+
+def status_path(project_root: Path) -> Path:
+    return project_root / STATE_DIR / STATUS_FILE
+
+def write_status(project_root: Path, status: Dict) -> None:
+    status = dict(status, updated_at=datetime.now().isoformat(timespec="seconds"))
+    path = status_path(project_root)
+    try:
+        ensure_state_dir(project_root)
+        atomic_write_bytes(path, (json.dumps(status, indent=2) + "\n").encode("utf-8"))
+    except OSError:
+        # Status reporting must never fail the push itself.
+        return
+
+def read_status(project_root: Path) -> Optional[Dict]:
+    try:
+        return json.loads(status_path(project_root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+async def push(project_root: Path, remote: str, branch: str, *, timeout: float = DEFAULT_PUSH_TIMEOUT,
+               retries: int = DEFAULT_PUSH_RETRIES, backoff: float = RETRY_BACKOFF) -> Dict:
+    """Push with a per-attempt timeout and retries, keeping the status file current."""
+    # A credential prompt would just sit out the timeout (stdin is not a terminal).
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+    started = perf_counter()
+    status: Dict = {
+        "state": "running", "remote": remote, "branch": branch, "attempt": 0, "max_attempts": retries + 1,
+        "pid": os.getpid(), "started_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_ms": 0.0, "error": None,
+    }
+    for attempt in range(1, retries + 2):
+        status.update(attempt=attempt, state="running" if attempt == 1 else "retrying")
+        write_status(project_root, status)
+        try:
+            result = await git(["push", remote, branch], project_root, timeout=timeout, env=env)
+            error = None if result.returncode == 0 else result.details()
+        except (TimeoutError, RuntimeError) as e:
+            error = str(e)
+        status.update(elapsed_ms=round((perf_counter() - started) * 1000, 1), error=error)
+        if error is None:
+            status["state"] = "succeeded"
+            break
+        if attempt <= retries:
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+    else:
+        status["state"] = "failed"
+    write_status(project_root, status)
+    return status
+
+def spawn_push(project_root: Path, remote: str, branch: str, *, timeout: float, retries: int) -> int:
+    """Start `handoffkit session push` detached from this terminal; returns its pid."""
+    import subprocess
+
+    state_dir = ensure_state_dir(project_root)
+    package_parent = str(Path(__file__).resolve().parent.parent)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (package_parent, env.get("PYTHONPATH")) if p)
+    cmd = [sys.executable, "-m", "handoffkit", "session", "push", "--root", str(project_root),
+           "--remote", remote, "--branch", branch, "--timeout", str(timeout), "--retries", str(retries)]
+    kwargs: Dict = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs["start_new_session"] = True
+    # Mark the push as pending before returning, so a poller never sees the previous run's result.
+    write_status(project_root, {"state": "running", "remote": remote, "branch": branch, "attempt": 0,
+                                "max_attempts": retries + 1, "pid": None,
+                                "started_at": datetime.now().isoformat(timespec="seconds"),
+                                "elapsed_ms": 0.0, "error": None})
+    with open(state_dir / LOG_FILE, "ab") as log:
+        proc = subprocess.Popen(cmd, cwd=str(project_root), env=env, stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, **kwargs)
+    return proc.pid
@@ -0,0 +1,124 @@
+"""Per-section fingerprints of the previous pack, for incremental rebuilds.
+
+Reading and materializing sections is already cached per source file (see
+cache.py). What a rebuild still redoes is counting every section and trimming
+the ones over their allocation, which with a BPE tokenizer is most of the
+cost. SectionStore remembers, for each section of the last pack, its token
+count and its trimmed text per target size, keyed by a fingerprint of
+(title, content hash, tokenizer, config). After an edit to docs/NOW.md only
+the NOW section is recounted; other sections are re-trimmed only if the
+allocator moved their target.
+
+The store lives in <project_root>/.handoffkit/sections.json and holds just the
+sections of the most recent pack.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .cache import STATE_DIR, atomic_write_bytes, ensure_state_dir
+from .stats import record_cache
+from .tokenizer import Tokenizer
+
+STORE_FILE = "sections.json"
+# Trimmed variants kept per section (the target moves as other sections change).
+MAX_TRIMS_PER_SECTION = 4
+
+def config_digest(cfg: Dict) -> str:
+    return hashlib.sha1(json.dumps(cfg, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class SectionStore:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._previous: Optional[Dict[str, Dict]] = None
+        self._current: Dict[str, Dict] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_project(cls, project_root: Path) -> "SectionStore":
+        return cls(project_root / STATE_DIR / STORE_FILE)
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._previous is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = None
+            self._previous = data if isinstance(data, dict) else {}
+        return self._previous
+
+    def begin(self) -> None:
+        """Start a new pack: entries not used by it are dropped on save()."""
+        with self._lock:
+            self._current = {}
+            self._dirty = False
+
+    def _entry(self, key: str) -> Dict:
+        entry = self._current.get(key)
+        if entry is None:
+            entry = self._load().get(key)
+            if entry is None:
+                entry = {"tokens": None, "trimmed": {}}
+                self._dirty = True
+            self._current[key] = entry
+        return entry
+
+    def section_keys(self, sections: Sequence[Tuple[str, str]], tokenizer: Tokenizer, cfg_digest: str) -> List[str]:
+        """Fingerprint of each (title, content) section."""
+        keys = []
+        for title, content in sections:
+            h = hashlib.sha1(json.dumps([title, tokenizer.name, cfg_digest]).encode("utf-8"))
+            h.update(content.encode("utf-8", errors="replace"))
+            keys.append(h.hexdigest())
+        return keys
+
+    def counts(self, keys: Sequence[str], texts: Sequence[str], tokenizer: Tokenizer,
+               known: Optional[Sequence[Optional[int]]] = None) -> List[int]:
+        """Token count per section, counting only the sections not seen in the previous pack.
+
+        `known` holds counts the caller already has (None where it has none).
+        """
+        with self._lock:
+            entries = [self._entry(k) for k in keys]
+        missing = [i for i, e in enumerate(entries) if e["tokens"] is None]
+        for e in entries:
+            record_cache("sections", e["tokens"] is not None)
+        if known is not None:
+            for i in [i for i in missing if known[i] is not None]:
+                entries[i]["tokens"] = known[i]
+            missing = [i for i in missing if known[i] is None]
+        if missing:
+            for i, n in zip(missing, tokenizer.count_many([texts[i] for i in missing])):
+                entries[i]["tokens"] = n
+        return [e["tokens"] for e in entries]
+
+    def trimmed(self, key: str, target: int) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            hit = self._entry(key)["trimmed"].get(str(target))
+        record_cache("sections", hit is not None)
+        return (hit[0], hit[1]) if hit else None
+
+    def put_trimmed(self, key: str, target: int, content: str, kept: int) -> None:
+        with self._lock:
+            trimmed = self._entry(key)["trimmed"]
+            trimmed[str(target)] = [content, kept]
+            self._dirty = True
+            while len(trimmed) > MAX_TRIMS_PER_SECTION:
+                trimmed.pop(next(iter(trimmed)))
+
+    def save(self) -> None:
+        """Persist this pack's sections, unless they are exactly the previous pack's."""
+        with self._lock:
+            if not self._dirty and self._current.keys() == self._load().keys():
+                return
+            self._previous = self._current
+            data = json.dumps(self._current)
+        try:
+            ensure_state_dir(self.path.parent.parent)
+            atomic_write_bytes(self.path, data.encode("utf-8"), unlink_first=True)
+        except OSError:
+            # Incremental state is an optimization; a read-only tree still gets packs.
+            return
@@ -0,0 +1,49 @@
+"""Write a single-file fast launcher for the handoffkit CLI.
+
+    python -m handoffkit.launcher ~/.local/bin/hk
+
+The console script installed by pip goes through the entry-point wrapper and
+a full `site` import (every .pth file in the environment is processed). The
+launcher instead runs this interpreter with -S and puts the directory holding
+this package on sys.path itself. handoffkit only needs the standard library,
+so nothing is lost. Re-run it after moving the install or the interpreter.
+"""
+import argparse
+import os
+import stat
+import sys
+from pathlib import Path
+
+TEMPLATE = """#!{interpreter} -S
+# Generated by `python -m handoffkit.launcher`; starts handoffkit without site/entry-point overhead.
+import sys
+sys.path.insert(0, {package_parent!r})
+from handoffkit.__main__ import main
+main()
+"""
+
+def render_launcher(interpreter: str, package_parent: Path) -> str:
+    return TEMPLATE.format(interpreter=interpreter, package_parent=str(package_parent))
+
+def write_launcher(dest: Path, interpreter: str = sys.executable) -> Path:
+    package_parent = Path(__file__).resolve().parent.parent
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_text(render_launcher(interpreter, package_parent), encoding="utf-8")
+    mode = dest.stat().st_mode
+    dest.chmod(mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return dest
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m handoffkit.launcher",
+                                 description="Write a fast-start handoffkit launcher script")
+    ap.add_argument("dest", help="Where to write the launcher (e.g. ~/.local/bin/hk)")
+    ap.add_argument("--python", default=sys.executable,
+                    help="Absolute path of the interpreter to run (default: the current one)")
+    args = ap.parse_args()
+    if not os.path.isabs(args.python):
+        ap.error("--python must be an absolute path (it goes in the #! line)")
+    dest = write_launcher(Path(args.dest).expanduser(), args.python)
+    print(f"Wrote {dest}")
+
+if __name__ == "__main__":
+    main()
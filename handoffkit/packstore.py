@@ -0,0 +1,343 @@
+"""Content-addressed archive of built packs, for auditing and reproducing them.
+
+Enabled with `role --store` or in config:
+
+    "pack_store": {"enabled": true, "max_packs": 1000, "max_age_days": 90,
+                   "compression": "auto"}
+
+Layout under <project_root>/.handoffkit/packs/:
+
+    objects/ab/<sha256>.zst|.gz   section bodies, role prompts and manifests,
+                                  each stored once however many packs use it
+    index.jsonl                   one line per stored pack, oldest first:
+                                  {"id", "created_at", "role", "branch",
+                                   "instruction", "tokens"}
+
+    lock                          held shared by put(), exclusively by prune()
+
+A manifest is the pack minus its large strings (those are replaced by object
+hashes), and a pack's id is the hash of its manifest, so building the same
+pack twice adds only an index line. Retention applies to index entries; a
+prune then deletes the objects no retained manifest refers to, so storage
+follows distinct content rather than how many packs were built. put() prunes
+only once the store is PRUNE_SLACK past a limit, so a full store is not
+pruned again on every put.
+
+A prune cannot delete what a concurrent put() is writing or reusing: puts
+hold the lock file shared from their first object to their index line, and a
+prune takes it exclusively. Where file locks are unavailable, objects written
+or reused within PRUNE_GRACE_SECONDS are never swept.
+
+"compression": "auto" uses zstd when available (Python 3.14's
+compression.zstd, or the zstandard package) and gzip otherwise. Objects keep
+their codec in the file suffix, so stores with mixed codecs read fine.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+from .cache import STATE_DIR, atomic_write_bytes, ensure_state_dir
+from .render import Pack, PackSection
+
+PACKS_DIR = "packs"
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = "lock"
+DEFAULT_MAX_PACKS = 1000
+DEFAULT_MAX_AGE_DAYS = 90
+INSTRUCTION_PREVIEW_CHARS = 200
+MANIFEST_VERSION = 1
+# put() prunes once the store is this share past max_packs or max_age_days.
+PRUNE_SLACK = 0.1
+PRUNE_GRACE_SECONDS = 600
+
+Codec = Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+def _zstd() -> Optional[Codec]:
+    try:
+        from compression import zstd  # Python 3.14+
+        return ".zst", zstd.compress, zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return ".zst", zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+def _gzip() -> Codec:
+    # mtime=0 keeps the compressed bytes a function of the content alone.
+    return ".gz", lambda data: gzip.compress(data, mtime=0), gzip.decompress
+
+def codec_for(name: str) -> Codec:
+    if name in ("auto", "zstd"):
+        codec = _zstd()
+        if codec is not None:
+            return codec
+        if name == "zstd":
+            raise ValueError("pack_store compression 'zstd' needs Python 3.14+ or the zstandard package")
+        return _gzip()
+    if name == "gzip":
+        return _gzip()
+    raise ValueError(f"Unknown pack_store compression: {name!r} (choose from auto, zstd, gzip)")
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class PackStore:
+    def __init__(self, project_root: Path, cfg: Optional[Dict] = None) -> None:
+        opts = (cfg or {}).get("pack_store") or {}
+        self.project_root = project_root
+        self.root = project_root / STATE_DIR / PACKS_DIR
+        self.objects = self.root / "objects"
+        self.index_path = self.root / INDEX_FILE
+        self.lock_path = self.root / LOCK_FILE
+        self.max_packs = int(opts.get("max_packs", DEFAULT_MAX_PACKS))
+        self.max_age_days = float(opts.get("max_age_days", DEFAULT_MAX_AGE_DAYS))
+        self.compression = str(opts.get("compression", "auto"))
+        self._codec: Optional[Codec] = None
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        if not self.root.is_dir():
+            ensure_state_dir(self.project_root)
+            self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    # -- objects ----------------------------------------------------------
+
+    def _object_path(self, oid: str, suffix: str) -> Path:
+        return self.objects / oid[:2] / f"{oid}{suffix}"
+
+    def _find_object(self, oid: str) -> Optional[Path]:
+        for suffix in (".zst", ".gz"):
+            p = self._object_path(oid, suffix)
+            if p.exists():
+                return p
+        return None
+
+    def put_object(self, data: bytes) -> str:
+        """Store `data` under its sha256 unless it is already there; returns the hash."""
+        oid = _digest(data)
+        existing = self._find_object(oid)
+        if existing is not None:
+            if fcntl is None:
+                # No lock to keep a prune off it: renew its grace period instead.
+                try:
+                    os.utime(existing)
+                except OSError:
+                    pass
+            return oid
+        if self._codec is None:
+            self._codec = codec_for(self.compression)
+        suffix, compress, _ = self._codec
+        path = self._object_path(oid, suffix)
+        if not path.parent.is_dir():
+            ensure_state_dir(self.project_root)
+            path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, compress(data))
+        return oid
+
+    def get_object(self, oid: str) -> bytes:
+        path = self._find_object(oid)
+        if path is None:
+            raise KeyError(f"Object {oid} is missing from {self.objects}")
+        if path.suffix == ".zst":
+            codec = _zstd()
+            if codec is None:
+                raise ValueError(f"{path} is zstd-compressed; install zstandard (or use Python 3.14+) to read it")
+            data = codec[2](path.read_bytes())
+        else:
+            data = gzip.decompress(path.read_bytes())
+        if _digest(data) != oid:
+            raise ValueError(f"Object {path} is corrupt (content does not match its hash)")
+        return data
+
+    def _put_text(self, text: str) -> str:
+        return self.put_object(text.encode("utf-8"))
+
+    def _get_text(self, oid: str) -> str:
+        return self.get_object(oid).decode("utf-8")
+
+    # -- packs ------------------------------------------------------------
+
+    def put(self, pack: Pack, *, instruction: str, branch: str, now: Optional[datetime] = None) -> Dict:
+        """Store `pack` and append it to the index; returns the index entry."""
+        with self._locked(exclusive=False):
+            manifest = {
+                "version": MANIFEST_VERSION,
+                "role": pack.role,
+                "role_prompt": self._put_text(pack.role_prompt),
+                "header": pack.header,
+                "sections": [dict(s._asdict(), body=self._put_text(s.body)) for s in pack.sections],
+                "footer": list(pack.footer),
+            }
+            pack_id = self.put_object(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+            created = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+            entry = {
+                "id": pack_id,
+                "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "role": pack.role,
+                "branch": branch,
+                "instruction": instruction[:INSTRUCTION_PREVIEW_CHARS],
+                "tokens": sum(s.kept for s in pack.sections),
+            }
+            line = (json.dumps(entry) + "\n").encode("utf-8")
+            # One O_APPEND write per entry, so concurrent writers never interleave lines.
+            fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        if self._over_retention(created):
+            self.prune(created)
+        return entry
+
+    def get(self, pack_id: str) -> Pack:
+        manifest = json.loads(self.get_object(pack_id))
+        sections = [PackSection(**dict(s, body=self._get_text(s["body"]))) for s in manifest["sections"]]
+        return Pack(manifest["role"], self._get_text(manifest["role_prompt"]), manifest["header"],
+                    sections, manifest["footer"])
+
+    def entries(self) -> Iterator[Dict]:
+        """Index entries, oldest first."""
+        try:
+            f = open(self.index_path, encoding="utf-8")
+        except OSError:
+            return
+        with f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn last line from a crashed writer; the next prune drops it.
+                    continue
+
+    def find(self, *, role: Optional[str] = None, branch: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Index entries matching all the given filters, newest first.
+
+        `since` / `until` compare against created_at, so any prefix of
+        YYYY-MM-DDTHH:MM:SSZ works ("2026-10", "2026-10-18T09").
+        """
+        out = []
+        for e in self.entries():
+            if role and e.get("role") != role:
+                continue
+            if branch and e.get("branch") != branch:
+                continue
+            if since and e.get("created_at", "") < since:
+                continue
+            if until and e.get("created_at", "")[:len(until)] > until:
+                continue
+            out.append(e)
+        out.reverse()
+        return out[:limit] if limit else out
+
+    def resolve(self, prefix: str) -> str:
+        """Full pack id for an unambiguous id prefix."""
+        ids = {e["id"] for e in self.entries() if e.get("id", "").startswith(prefix)}
+        if not ids:
+            raise KeyError(f"No stored pack matches {prefix!r}")
+        if len(ids) > 1:
+            raise KeyError(f"Pack id prefix {prefix!r} is ambiguous ({len(ids)} packs)")
+        return ids.pop()
+
+    # -- retention --------------------------------------------------------
+
+    def _cutoff(self, now: datetime, slack: float = 0.0) -> str:
+        return (now - timedelta(days=self.max_age_days * (1 + slack))).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _over_retention(self, now: datetime) -> bool:
+        """Cheap check: PRUNE_SLACK more lines than max_packs, or an oldest entry that far past max_age_days."""
+        try:
+            data = self.index_path.read_bytes()
+        except OSError:
+            return False
+        if data.count(b"\n") > self.max_packs + max(1, int(self.max_packs * PRUNE_SLACK)):
+            return True
+        try:
+            oldest = json.loads(data[:data.index(b"\n")])
+        except ValueError:
+            return True
+        return oldest.get("created_at", "") < self._cutoff(now, PRUNE_SLACK)
+
+    def prune(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Apply retention to the index, then delete objects no kept pack refers to."""
+        with self._locked(exclusive=True):
+            return self._prune(now or datetime.now(timezone.utc))
+
+    def _prune(self, now: datetime) -> Dict[str, int]:
+        cutoff = self._cutoff(now)
+        entries = list(self.entries())
+        kept = [e for e in entries if e.get("created_at", "") >= cutoff][-self.max_packs:] if self.max_packs > 0 else []
+        if self.index_path.exists():
+            # Rewriting also drops torn lines.
+            atomic_write_bytes(self.index_path, "".join(json.dumps(e) + "\n" for e in kept).encode("utf-8"))
+
+        live: Set[str] = set()
+        for pack_id in {e["id"] for e in kept}:
+            try:
+                manifest = json.loads(self.get_object(pack_id))
+            except (KeyError, ValueError):
+                continue
+            live.add(pack_id)
+            live.add(manifest["role_prompt"])
+            live.update(s["body"] for s in manifest["sections"])
+        grace = time.time() - PRUNE_GRACE_SECONDS if fcntl is None else None
+        removed = freed = 0
+        for path in self._object_files():
+            if path.name.split(".", 1)[0] in live:
+                continue
+            try:
+                st = path.stat()
+                if grace is not None and st.st_mtime > grace:
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            removed += 1
+            freed += st.st_size
+        return {"packs_removed": len(entries) - len(kept), "objects_removed": removed, "bytes_freed": freed}
+
+    def _object_files(self) -> Iterator[Path]:
+        if not self.objects.is_dir():
+            return
+        for sub in os.scandir(self.objects):
+            if sub.is_dir():
+                for e in os.scandir(sub.path):
+                    # In-flight writes are .tmp files; never sweep those.
+                    if e.name.endswith((".zst", ".gz")):
+                        yield Path(e.path)
+
+    def stats(self) -> Dict[str, object]:
+        files = list(self._object_files())
+        entries = list(self.entries())
+        return {
+            "path": str(self.root),
+            "packs": len(entries),
+            "distinct_packs": len({e["id"] for e in entries}),
+            "objects": len(files),
+            "bytes": sum(p.stat().st_size for p in files),
+        }
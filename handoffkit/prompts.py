@@ -0,0 +1,215 @@
+"""Role prompts compiled once into cached artefacts.
+
+A role prompt comes from the project's .github/agents/<slug>.agent.md (YAML
+frontmatter + Markdown body) or from the kit's templates/<role>.md. Compiling
+one parses the frontmatter into metadata, splits the body into literal text
+and {{variable}} placeholders, and counts the body's tokens. The artefact is a
+plain dict, so it goes through the disk cache like any other value derived
+from a file and is recompiled as soon as the source file changes.
+
+Variables filled in at render time:
+
+    {{branch}}   current git branch ("" outside a repository)
+    {{role}}     the role the pack is built for
+    {{date}}     today's date, YYYY-MM-DD
+
+Unknown placeholders are left in the text as written.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .tokenizer import Tokenizer
+
+# Bump when the artefact layout changes so stale cache entries are ignored.
+ARTEFACT_VERSION = 1
+VARIABLES = ("branch", "role", "date")
+
+# Patterns only compiling a prompt needs; re compiles (and caches) them on
+# first use, so a run served from the cache never does.
+_VARIABLE = r"{{\s*(\w+)\s*}}"
+_KEY = r"^([^\s:#\-][^:]*?)\s*:(?:\s+(.*))?$"
+_NUMBER = r"^[-+]?\d+(\.\d+)?$"
+
+def split_frontmatter(text: str) -> Tuple[Optional[str], str]:
+    """(frontmatter source or None, body) for a document opening with a --- line."""
+    from .docscan import scan
+
+    doc = scan(text)
+    return doc.frontmatter_text(), doc.body()
+
+def parse_frontmatter(source: str) -> Dict:
+    """Metadata from frontmatter: the YAML subset agent files use.
+
+    Block mappings and lists (including lists of mappings), inline [a, b]
+    lists, quoted strings, numbers, booleans and null. Raises ValueError on
+    anything else (block scalars, anchors, flow mappings).
+    """
+    lines = []
+    for raw in source.splitlines():
+        stripped = raw.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if "\t" in raw[:len(raw) - len(raw.lstrip())]:
+            raise ValueError(f"Tab indentation in frontmatter: {raw!r}")
+        lines.append((len(raw) - len(raw.lstrip()), stripped))
+    if not lines:
+        return {}
+    value, i = _parse_block(lines, 0, lines[0][0])
+    if i != len(lines):
+        raise ValueError(f"Unexpected indentation in frontmatter: {lines[i][1]!r}")
+    if not isinstance(value, dict):
+        raise ValueError("Frontmatter is not a mapping")
+    return value
+
+def _is_item(content: str) -> bool:
+    return content == "-" or content.startswith("- ")
+
+def _parse_block(lines: List[Tuple[int, str]], i: int, indent: int):
+    if _is_item(lines[i][1]):
+        items = []
+        while i < len(lines) and lines[i][0] == indent and _is_item(lines[i][1]):
+            content = lines[i][1]
+            rest = content[1:].lstrip()
+            if not rest:
+                i += 1
+                if i < len(lines) and lines[i][0] > indent:
+                    value, i = _parse_block(lines, i, lines[i][0])
+                else:
+                    value = None
+            elif re.match(_KEY, rest):
+                # "- key: value" opens a mapping whose keys line up with `key`.
+                lines[i] = (indent + len(content) - len(rest), rest)
+                value, i = _parse_block(lines, i, lines[i][0])
+            else:
+                value = _scalar(rest)
+                i += 1
+            items.append(value)
+        return items, i
+
+    mapping: Dict = {}
+    while i < len(lines) and lines[i][0] == indent and not _is_item(lines[i][1]):
+        m = re.match(_KEY, lines[i][1])
+        if not m:
+            raise ValueError(f"Unsupported frontmatter line: {lines[i][1]!r}")
+        key, rest = m.group(1), (m.group(2) or "").strip()
+        i += 1
+        if rest:
+            if rest[0] in "|>&*{":
+                raise ValueError(f"Unsupported frontmatter value for {key!r}: {rest!r}")
+            mapping[key] = _scalar(rest)
+        elif i < len(lines) and (lines[i][0] > indent or (lines[i][0] == indent and _is_item(lines[i][1]))):
+            mapping[key], i = _parse_block(lines, i, lines[i][0])
+        else:
+            mapping[key] = None
+    return mapping, i
+
+def _scalar(text: str):
+    if text[0] in "'\"":
+        return _quoted(text)
+    if text.startswith("[") and text.endswith("]"):
+        inner = text[1:-1].strip()
+        return [_scalar(part.strip()) for part in inner.split(",")] if inner else []
+    if " #" in text:
+        text = text[:text.index(" #")].rstrip()
+    lowered = text.lower()
+    if lowered in ("true", "yes"):
+        return True
+    if lowered in ("false", "no"):
+        return False
+    if lowered in ("null", "~"):
+        return None
+    if re.match(_NUMBER, text):
+        return float(text) if "." in text else int(text)
+    return text
+
+def _quoted(text: str) -> str:
+    if text[0] == '"':
+        try:
+            value, end = json.JSONDecoder().raw_decode(text)
+        except ValueError:
+            raise ValueError(f"Bad string in frontmatter: {text!r}") from None
+    else:
+        end = 1
+        while True:
+            end = text.find("'", end)
+            if end < 0:
+                raise ValueError(f"Unterminated string in frontmatter: {text!r}")
+            if text[end + 1:end + 2] != "'":
+                break
+            end += 2
+        end += 1
+        value = text[1:end - 1].replace("''", "'")
+    rest = text[end:].strip()
+    if rest and not rest.startswith("#"):
+        raise ValueError(f"Unexpected text after string in frontmatter: {text!r}")
+    return value
+
+class RolePrompt(NamedTuple):
+    source: str                 # path the prompt was compiled from
+    metadata: Dict              # parsed frontmatter ({} for kit templates)
+    literals: List[str]         # body text around the placeholders
+    placeholders: List[Tuple[str, str]]  # (variable name, placeholder as written)
+    tokens: int                 # token count of the body as written
+    tokenizer: str
+
+    @property
+    def variables(self) -> List[str]:
+        return sorted({name for name, _ in self.placeholders})
+
+    def render(self, values: Dict[str, str]) -> str:
+        if not self.placeholders:
+            return self.literals[0]
+        out = [self.literals[0]]
+        for (name, raw), literal in zip(self.placeholders, self.literals[1:]):
+            out.append(values.get(name, raw))
+            out.append(literal)
+        return "".join(out)
+
+    def to_dict(self) -> Dict:
+        data = self._asdict()
+        data["version"] = ARTEFACT_VERSION
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RolePrompt":
+        return cls(data["source"], data["metadata"], list(data["literals"]),
+                   [(name, raw) for name, raw in data["placeholders"]], data["tokens"], data["tokenizer"])
+
+def compile_prompt(source: Path, text: str, tokenizer: Tokenizer, *, frontmatter: bool = True) -> Dict:
+    """The cacheable artefact (RolePrompt.to_dict()) for prompt file `source` with contents `text`."""
+    metadata: Dict = {}
+    body = text
+    if frontmatter:
+        fm, body = split_frontmatter(text)
+        if fm is not None:
+            try:
+                metadata = parse_frontmatter(fm)
+            except ValueError as e:
+                # The body is still usable; keep the reason alongside it.
+                metadata = {"error": str(e)}
+    body = body.strip()
+    literals: List[str] = []
+    placeholders: List[Tuple[str, str]] = []
+    pos = 0
+    for m in re.finditer(_VARIABLE, body):
+        literals.append(body[pos:m.start()])
+        placeholders.append((m.group(1), m.group(0)))
+        pos = m.end()
+    literals.append(body[pos:])
+    return RolePrompt(str(source), metadata, literals, placeholders,
+                      tokenizer.count(body), tokenizer.name).to_dict()
+
+def variable_values(prompt: RolePrompt, role: str, branch: Callable[[], str]) -> Dict[str, str]:
+    """Values for the variables `prompt` uses; the branch is only looked up when needed."""
+    values: Dict[str, str] = {}
+    for name in prompt.variables:
+        if name == "role":
+            values[name] = role
+        elif name == "date":
+            from datetime import date
+            values[name] = date.today().isoformat()
+        elif name == "branch":
+            values[name] = branch()
+    return values
@@ -0,0 +1,101 @@
+"""Output formats for a built pack, written to a stream section by section.
+
+A Pack keeps the role prompt and every section as separate strings, so the
+writers never join them into one big string first (diffs and selections can be
+large). Formats:
+
+    text      the Markdown prompt (the default, what `role` always printed)
+    json      {"role", "role_prompt", "header", "sections": [...], "footer"}
+              with per-section priority and token accounting
+    messages  chat-API style [{"role": "system", ...}, {"role": "user", ...}]
+"""
+import json
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO
+
+FORMATS = ("text", "json", "messages")
+
+class PackSection(NamedTuple):
+    title: str
+    heading: Optional[str]  # None when the content carries its own heading (fenced inputs)
+    body: str
+    priority: int
+    tokens: int
+    allocated: int
+    kept: int
+
+class Pack(NamedTuple):
+    role: str
+    role_prompt: str
+    header: str
+    sections: List[PackSection]
+    footer: List[str]
+
+    def lines(self) -> Iterator[str]:
+        """The pack's Markdown lines, to be joined with newlines."""
+        yield self.header
+        yield ""
+        for section in self.sections:
+            if section.heading:
+                yield section.heading
+            yield section.body
+            yield ""
+        yield from self.footer
+
+    def text(self) -> str:
+        return "\n".join(self.lines()).strip()
+
+    def to_dict(self) -> Dict:
+        return {
+            "role": self.role,
+            "role_prompt": self.role_prompt,
+            "header": self.header,
+            "sections": [s._asdict() for s in self.sections],
+            "footer": list(self.footer),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Pack":
+        return cls(data["role"], data["role_prompt"], data["header"],
+                   [PackSection(**s) for s in data["sections"]], list(data["footer"]))
+
+def write_pack(pack: Pack, out: TextIO, fmt: str = "text") -> None:
+    if fmt == "text":
+        write_text(pack, out)
+    elif fmt == "json":
+        write_json(pack, out)
+    elif fmt == "messages":
+        write_messages(pack, out)
+    else:
+        raise ValueError(f"Unknown output format: {fmt!r} (choose from {', '.join(FORMATS)})")
+
+def write_text(pack: Pack, out: TextIO) -> None:
+    out.write(pack.role_prompt)
+    out.write("\n\n")
+    _write_joined(pack.lines(), out, "\n")
+    out.write("\n")
+
+def write_json(pack: Pack, out: TextIO) -> None:
+    out.write("{")
+    for key in ("role", "role_prompt", "header"):
+        out.write(f"{json.dumps(key)}: {json.dumps(getattr(pack, key))}, ")
+    out.write('"sections": [')
+    for i, section in enumerate(pack.sections):
+        if i:
+            out.write(", ")
+        # One section at a time; the body is the only large field.
+        out.write(json.dumps(section._asdict()))
+    out.write(f'], "footer": {json.dumps(pack.footer)}}}\n')
+
+def write_messages(pack: Pack, out: TextIO) -> None:
+    out.write('[{"role": "system", "content": ')
+    out.write(json.dumps(pack.role_prompt))
+    out.write('}, {"role": "user", "content": "')
+    # JSON escaping is per character, so escaped pieces concatenate into the escaped whole.
+    _write_joined((json.dumps(line)[1:-1] for line in pack.lines()), out, "\\n")
+    out.write('"}]\n')
+
+def _write_joined(parts: Iterator[str], out: TextIO, sep: str) -> None:
+    for i, part in enumerate(parts):
+        if i:
+            out.write(sep)
+        out.write(part)
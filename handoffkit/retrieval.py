@@ -0,0 +1,240 @@
+"""BM25 retrieval over the project's Markdown docs, split by heading.
+
+Enabled by a non-zero "retrieval_share" in the config: the share of
+token_budget that the "Relevant docs" section may fill with the chunks that
+best match the instruction (and selection). Other keys:
+
+    "retrieval_dirs": ["docs"]      directories searched for *.md
+    "retrieval_max_chunks": 8       upper bound on chunks pulled in
+
+The index is kept in <project_root>/.handoffkit/docs-index.json with each
+file's (mtime, size). Every query re-stats the tree and re-chunks only the
+files that changed, adjusting the document frequencies in place, so a query
+costs a directory walk plus one pass over the chunk list.
+"""
+import json
+import math
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .cache import STATE_DIR, atomic_write_bytes, ensure_state_dir, walk_files
+from .stats import record_cache, record_read
+from .textio import decode_text
+
+INDEX_FILE = "docs-index.json"
+INDEX_VERSION = 1
+DEFAULT_DIRS = ["docs"]
+DEFAULT_MAX_CHUNKS = 8
+# Long sections are split at paragraph breaks so one chunk cannot eat the share.
+MAX_CHUNK_CHARS = 2400
+QUERY_MAX_CHARS = 4000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"[a-z0-9_]{2,}")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_STOPWORDS = frozenset(
+    "an and are as at be but by do does for from has have how if in into is it its of on or that the their "
+    "then there these this to was we were what when where which who will with you your".split()
+)
+
+def terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+class Chunk(NamedTuple):
+    path: str      # relative to the project root, POSIX separators
+    heading: str   # "Title > Section > Subsection"
+    text: str
+
+def split_markdown(rel: str, text: str) -> List[Chunk]:
+    """Chunks of a Markdown document, one per heading (fenced code is never split)."""
+    chunks: List[Chunk] = []
+    trail: List[str] = []
+    lines: List[str] = []
+    fence = None
+
+    def flush() -> None:
+        body = "\n".join(lines).strip()
+        if body:
+            heading = " > ".join(trail) or rel
+            for part in _split_long(body):
+                chunks.append(Chunk(rel, heading, part))
+        lines.clear()
+
+    for line in text.splitlines():
+        stripped = line.lstrip()
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            marker = stripped[:3]
+            if fence is None:
+                fence = marker
+            elif fence == marker:
+                fence = None
+        m = _HEADING.match(line) if fence is None else None
+        if m:
+            flush()
+            # The heading goes into the trail; the chunk body is what follows it.
+            del trail[len(m.group(1)) - 1:]
+            trail.append(m.group(2))
+            continue
+        lines.append(line)
+    flush()
+    return chunks
+
+def _split_long(body: str) -> List[str]:
+    if len(body) <= MAX_CHUNK_CHARS:
+        return [body]
+    parts: List[str] = []
+    current = ""
+    for para in body.split("\n\n"):
+        if current and len(current) + len(para) + 2 > MAX_CHUNK_CHARS:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n\n{para}" if current else para
+    if current:
+        parts.append(current)
+    return parts
+
+class DocsIndex:
+    """Persistent BM25 index; refresh() brings it in line with the files on disk."""
+
+    def __init__(self, project_root: Path, dirs: Sequence[str]) -> None:
+        self.project_root = project_root
+        self.dirs = list(dirs)
+        self.path = project_root / STATE_DIR / INDEX_FILE
+        self.files: Dict[str, Dict] = {}   # rel -> {"sig": [mtime_ns, size], "chunks": [...]}
+        self.df: Dict[str, int] = {}
+        self.total_len = 0
+        self.n_chunks = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION or data.get("dirs") != self.dirs:
+            return
+        self.files = data["files"]
+        self.df = data["df"]
+        self.total_len = data["total_len"]
+        self.n_chunks = data["n_chunks"]
+
+    def _save(self) -> None:
+        data = {"version": INDEX_VERSION, "dirs": self.dirs, "files": self.files, "df": self.df,
+                "total_len": self.total_len, "n_chunks": self.n_chunks}
+        try:
+            ensure_state_dir(self.project_root)
+            atomic_write_bytes(self.path, json.dumps(data).encode("utf-8"), unlink_first=True)
+        except OSError:
+            return
+
+    def _scan(self) -> Dict[str, List[int]]:
+        found: Dict[str, List[int]] = {}
+        for d in self.dirs:
+            for _, files in walk_files(self.project_root / d):
+                for e in files:
+                    if not e.name.endswith(".md"):
+                        continue
+                    try:
+                        st = e.stat()
+                        rel = Path(e.path).relative_to(self.project_root).as_posix()
+                    except (OSError, ValueError):
+                        continue
+                    found[rel] = [st.st_mtime_ns, st.st_size]
+        return found
+
+    def _apply(self, chunks: Iterable[Dict], sign: int) -> None:
+        for c in chunks:
+            self.n_chunks += sign
+            self.total_len += sign * c["len"]
+            for t in c["tf"]:
+                n = self.df.get(t, 0) + sign
+                if n > 0:
+                    self.df[t] = n
+                else:
+                    self.df.pop(t, None)
+
+    def refresh(self) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            found = self._scan()
+            changed = False
+            for rel in [r for r in self.files if r not in found]:
+                self._apply(self.files.pop(rel)["chunks"], -1)
+                changed = True
+            for rel, sig in found.items():
+                entry = self.files.get(rel)
+                if entry is not None and entry["sig"] == sig:
+                    record_cache("docs_index", True)
+                    continue
+                record_cache("docs_index", False)
+                if entry is not None:
+                    self._apply(entry["chunks"], -1)
+                chunks = []
+                try:
+                    data = (self.project_root / rel).read_bytes()
+                except OSError:
+                    self.files.pop(rel, None)
+                    continue
+                record_read(self.project_root / rel, len(data))
+                for chunk in split_markdown(rel, decode_text(data)):
+                    words = terms(chunk.heading + "\n" + chunk.text)
+                    tf: Dict[str, int] = {}
+                    for w in words:
+                        tf[w] = tf.get(w, 0) + 1
+                    chunks.append({"heading": chunk.heading, "text": chunk.text, "tf": tf, "len": len(words)})
+                self.files[rel] = {"sig": sig, "chunks": chunks}
+                self._apply(chunks, +1)
+                changed = True
+            if changed:
+                self._save()
+
+    def search(self, query: str, exclude: Iterable[str] = ()) -> List[Tuple[float, Chunk]]:
+        """Chunks matching `query`, best first (files in `exclude` are skipped)."""
+        q = set(terms(query[:QUERY_MAX_CHARS]))
+        skip = set(exclude)
+        with self._lock:
+            if not q or not self.n_chunks:
+                return []
+            avg = self.total_len / self.n_chunks or 1.0
+            idf = {t: math.log(1 + (self.n_chunks - self.df[t] + 0.5) / (self.df[t] + 0.5)) for t in q if t in self.df}
+            if not idf:
+                return []
+            scored = []
+            for rel, entry in self.files.items():
+                if rel in skip:
+                    continue
+                for c in entry["chunks"]:
+                    tf = c["tf"]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * c["len"] / avg)
+                    score = 0.0
+                    for t, w in idf.items():
+                        f = tf.get(t)
+                        if f:
+                            score += w * f * (BM25_K1 + 1) / (f + norm)
+                    if score > 0:
+                        scored.append((score, Chunk(rel, c["heading"], c["text"])))
+        scored.sort(key=lambda sc: -sc[0])
+        return scored
+
+_indexes: Dict[Tuple[str, Tuple[str, ...]], DocsIndex] = {}
+_indexes_lock = threading.Lock()
+
+def docs_index(project_root: Path, dirs: Optional[Sequence[str]] = None) -> DocsIndex:
+    """The (process-wide) index for `project_root`, refreshed against the files on disk."""
+    dirs = list(dirs or DEFAULT_DIRS)
+    key = (str(project_root), tuple(dirs))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = DocsIndex(project_root, dirs)
+    index.refresh()
+    return index
+
+def render_chunk(chunk: Chunk) -> str:
+    return f"### {chunk.path} › {chunk.heading}\n\n{chunk.text}"
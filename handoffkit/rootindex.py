@@ -0,0 +1,137 @@
+"""Persistent per-user index of discovered project roots and parsed configs.
+
+find_project_root stats two paths in every ancestor directory, and on
+network-mounted home directories those stats dominate cold start. The index
+remembers, per invocation directory, which root was found and through which
+marker, along with the mtime of every directory the walk passed before the
+root (and of each docs/ among them). An entry is trusted while none of those
+mtimes changed and the marker still exists, so a marker created nearer than
+the cached root invalidates it. A lookup costs about two stats per level
+walked, rather than a full discovery. Parsed configs are stored alongside, keyed by their
+candidate paths and validated by (mtime, size).
+
+The index lives in $HANDOFFKIT_CACHE_DIR, $XDG_CACHE_HOME/handoffkit or
+~/.cache/handoffkit. Both it and $HANDOFFKIT_ROOT, which skips discovery
+entirely, apply only when no --root is given.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .cache import atomic_write_bytes, file_signature
+from .stats import record_cache
+
+ROOT_ENV = "HANDOFFKIT_ROOT"
+CACHE_DIR_ENV = "HANDOFFKIT_CACHE_DIR"
+INDEX_FILE = "startup-index.json"
+MAX_ROOTS = 256
+MAX_CONFIGS = 64
+
+def user_cache_dir() -> Path:
+    base = os.environ.get(CACHE_DIR_ENV)
+    if base:
+        return Path(base)
+    xdg = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    return (Path(xdg) if xdg else Path.home() / ".cache") / "handoffkit"
+
+def _mtime(p: str) -> Optional[int]:
+    try:
+        return os.stat(p).st_mtime_ns
+    except OSError:
+        return None
+
+class StartupIndex:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or user_cache_dir() / INDEX_FILE
+        self._data: Optional[Dict] = None
+        self._dirty = False
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = None
+            if not isinstance(data, dict):
+                data = {}
+            data.setdefault("roots", {})
+            data.setdefault("configs", {})
+            self._data = data
+        return self._data
+
+    def lookup_root(self, start: str) -> Optional[Path]:
+        entry = self._load()["roots"].get(start)
+        marker = entry.get("marker") if entry else None
+        if (not entry or "dirs" not in entry
+                or any(_mtime(d) != mtime for d, mtime in entry["dirs"])
+                or (marker is not None and _mtime(marker) is None)):
+            record_cache("startup_index", False)
+            return None
+        record_cache("startup_index", True)
+        return Path(entry["root"])
+
+    def record_root(self, start: str, root: Path, marker: Optional[Path]) -> None:
+        roots = self._load()["roots"]
+        roots.pop(start, None)
+        roots[start] = {
+            "root": str(root),
+            "marker": str(marker) if marker is not None else None,
+            "dirs": _walked_dirs(start, str(root) if marker is not None else None),
+        }
+        # Dicts keep insertion order: drop the least recently recorded first.
+        while len(roots) > MAX_ROOTS:
+            roots.pop(next(iter(roots)))
+        self._dirty = True
+
+    def lookup_config(self, candidates: List[Path]) -> Tuple[bool, Optional[Dict]]:
+        entry = self._load()["configs"].get(_config_key(candidates))
+        sigs = [list(s) if s else None for s in (file_signature(p) for p in candidates)] if entry else None
+        if not entry or entry.get("signatures") != sigs:
+            record_cache("startup_index", False)
+            return False, None
+        record_cache("startup_index", True)
+        return True, entry["config"]
+
+    def record_config(self, candidates: List[Path], cfg: Dict) -> None:
+        configs = self._load()["configs"]
+        key = _config_key(candidates)
+        configs.pop(key, None)
+        configs[key] = {
+            "signatures": [list(s) if s else None for s in (file_signature(p) for p in candidates)],
+            "config": cfg,
+        }
+        while len(configs) > MAX_CONFIGS:
+            configs.pop(next(iter(configs)))
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty or self._data is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(self.path, json.dumps(self._data).encode("utf-8"), unlink_first=True)
+        except OSError:
+            # An unwritable cache dir only costs us the speed-up.
+            return
+        self._dirty = False
+
+def _walked_dirs(start: str, root: Optional[str]) -> List[List]:
+    """[path, mtime_ns] of `start`, of every ancestor below `root` (all of them
+    if None) and of each docs/ among those: where a nearer marker would appear."""
+    out: List[List] = [[start, _mtime(start)]]
+    d = start
+    while d != root:
+        docs = os.path.join(d, "docs")
+        docs_mtime = _mtime(docs)
+        if docs_mtime is not None:
+            out.append([docs, docs_mtime])
+        parent = os.path.dirname(d)
+        if parent == d or parent == root:
+            break
+        d = parent
+        out.append([d, _mtime(d)])
+    return out
+
+def _config_key(candidates: List[Path]) -> str:
+    return "\0".join(str(p) for p in candidates)
@@ -0,0 +1,241 @@
+"""SQLite (WAL) backend for the on-disk section cache, safe to share between processes.
+
+Selected with "cache_backend": "sqlite" in config. It has the same interface
+and staleness rules as DiskCache: an entry whose source has the same (size,
+mtime) is a hit, and otherwise the source is hashed, so a touched-but-unchanged
+file still skips re-deriving. Entries live in
+<project_root>/.handoffkit/cache.sqlite3 instead of one JSON file each.
+
+Concurrency: in WAL mode readers never block, not even behind a writer, so
+any number of handoffkit processes (editor windows, agents, `batch` threads)
+can read the same entries at once. SQLite admits one writer at a time. Writes
+take the lock up front with BEGIN IMMEDIATE and wait up to BUSY_TIMEOUT_MS for
+it, so concurrent writers queue up rather than fail or interleave. Hits refresh
+an entry's LRU timestamp at most once per TOUCH_INTERVAL, so a burst of reads
+does not turn into a burst of writes.
+
+When to choose it: both backends beat building uncached, and the default
+"files" backend is the simpler one. SQLite pulls ahead as more processes share
+one project. benchmarks/cache_stress.py runs N processes against each backend
+and reports packs/s next to an uncached run.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Tuple, TypeVar, Union
+
+from .cache import DEFAULT_MAX_BYTES, STATE_DIR, TOUCH_INTERVAL, ensure_state_dir
+from .stats import record_cache, record_read
+
+T = TypeVar("T")
+
+DB_FILE = "cache.sqlite3"
+BUSY_TIMEOUT_MS = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    source TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT,
+    value TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_used_at ON entries(used_at);
+"""
+
+class SQLiteCache:
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.root = path  # what `handoffkit cache` reports
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+    @classmethod
+    def for_project(cls, project_root: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> "SQLiteCache":
+        return _shared(project_root / STATE_DIR / DB_FILE, max_bytes)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread: sqlite3 connections must not be shared between threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            ensure_state_dir(self.path.parent.parent)
+            conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+                conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _key(self, source: Union[Path, str], params: Hashable) -> str:
+        return hashlib.sha1(json.dumps([str(source), params], default=str).encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Tuple]:
+        try:
+            return self._conn().execute(
+                "SELECT size, mtime_ns, sha256, value, used_at FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def _write(self, sql: str, args: Tuple, *, evict: bool = False) -> None:
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(sql, args)
+                if evict:
+                    self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            # A locked-out or read-only cache still produces packs, just uncached.
+            return
+
+    def _store(self, key: str, source: Optional[Path], st: Optional[os.stat_result], sha: Optional[str],
+               value: object) -> None:
+        data = json.dumps(value)
+        self._write(
+            "INSERT OR REPLACE INTO entries (key, source, size, mtime_ns, sha256, value, bytes, used_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, str(source) if source is not None else None, st.st_size if st else None,
+             st.st_mtime_ns if st else None, sha, data, len(data), time.time()),
+            evict=True,
+        )
+
+    def _touch(self, key: str, used_at: float) -> None:
+        now = time.time()
+        if now - used_at >= TOUCH_INTERVAL:
+            self._write("UPDATE entries SET used_at = ? WHERE key = ?", (now, key))
+
+    def _hit(self, key: str, row: Tuple) -> object:
+        self._touch(key, row[4])
+        self.hits += 1
+        record_cache("disk", True)
+        return json.loads(row[3])
+
+    def get(self, source: Path, params: Hashable, derive: Callable[[bytes], T]) -> Optional[T]:
+        """Return derive(source bytes), cached; None if `source` does not exist."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        key = self._key(source, params)
+        row = self._lookup(key)
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return self._hit(key, row)  # type: ignore[return-value]
+
+        try:
+            data = source.read_bytes()
+        except OSError:
+            return None
+        record_read(source, len(data))
+        sha = hashlib.sha256(data).hexdigest()
+        if row and row[2] == sha:
+            value = json.loads(row[3])
+            self.hits += 1
+            record_cache("disk", True)
+            # Same content, new signature: re-sign so the next lookup skips hashing.
+            self._write("UPDATE entries SET size = ?, mtime_ns = ?, used_at = ? WHERE key = ?",
+                        (st.st_size, st.st_mtime_ns, time.time(), key))
+            return value
+        value = derive(data)
+        self.misses += 1
+        record_cache("disk", False)
+        self._store(key, source, st, sha, value)
+        return value
+
+    def get_by_stat(self, source: Path, params: Hashable, derive: Callable[[Path], T]) -> Optional[T]:
+        """Like get(), but validated by (size, mtime) alone and derived from the path."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        key = self._key(source, params)
+        row = self._lookup(key)
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return self._hit(key, row)  # type: ignore[return-value]
+        try:
+            value = derive(source)
+        except OSError:
+            return None
+        self.misses += 1
+        record_cache("disk", False)
+        self._store(key, source, st, None, value)
+        return value
+
+    def get_value(self, key: Hashable) -> Optional[object]:
+        """Value stored under a plain key by put_value (no source file involved)."""
+        k = self._key("<key>", key)
+        row = self._lookup(k)
+        if row is None:
+            self.misses += 1
+            record_cache("disk", False)
+            return None
+        return self._hit(k, row)
+
+    def put_value(self, key: Hashable, value: object) -> None:
+        self._store(self._key("<key>", key), None, None, None, value)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for key, size in conn.execute("SELECT key, bytes FROM entries ORDER BY used_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        return removed
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until under max_bytes; returns count removed."""
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            removed = self._evict(conn)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            return 0
+        return removed
+
+    def clear(self) -> int:
+        try:
+            conn = self._conn()
+            removed = conn.execute("DELETE FROM entries").rowcount
+            conn.execute("VACUUM")
+        except sqlite3.Error:
+            return 0
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        try:
+            entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+        return {"path": str(self.path), "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+_caches: Dict[str, SQLiteCache] = {}
+_caches_lock = threading.Lock()
+
+def _shared(path: Path, max_bytes: int) -> SQLiteCache:
+    """One SQLiteCache (and so one connection per thread) per database file in this process."""
+    with _caches_lock:
+        cache = _caches.get(str(path))
+        if cache is None:
+            cache = _caches[str(path)] = SQLiteCache(path, max_bytes)
+        cache.max_bytes = max_bytes
+        return cache
@@ -0,0 +1,121 @@
+"""Per-pack instrumentation: stage timings, bytes read, section and prompt tokens, cache events.
+
+A PackStats is made current with collecting() for the duration of one pack
+build. Readers and caches report into whatever is current, so nothing has to
+be threaded through their signatures; with no PackStats current every
+record_* call is a no-op. Contexts are per thread, so the packs built
+concurrently by `handoffkit batch` are accounted separately.
+
+Hooks see every finished pack, whether built by the CLI, `batch` or `serve`:
+
+    from handoffkit import stats
+
+    def send(pack_stats: dict) -> None:
+        metrics.gauge("handoffkit.render_ms", pack_stats["stages_ms"].get("render", 0))
+
+    stats.add_hook(send)
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+_current: "ContextVar[Optional[PackStats]]" = ContextVar("handoffkit_pack_stats", default=None)
+_hooks: List[Callable[[Dict], None]] = []
+
+class PackStats:
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}  # seconds, accumulated per stage
+        self.bytes_read: Dict[str, int] = {}
+        self.cache: Dict[str, Dict[str, int]] = {}
+        self.sections: List[Dict] = []
+        self.role_prompt: Dict = {}
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_read(self, path: str, nbytes: int) -> None:
+        self.bytes_read[path] = self.bytes_read.get(path, 0) + nbytes
+
+    def add_cache_event(self, cache: str, hit: bool) -> None:
+        counts = self.cache.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def set_sections(self, budget_rows: List[Dict]) -> None:
+        """Per-section token accounting from build_context_pack's budget report rows."""
+        self.sections = [{"title": r["title"], "tokens_before": r["tokens"], "tokens_after": r["kept"],
+                          "allocated": r["allocated"]} for r in budget_rows]
+
+    def set_role_prompt(self, source: str, tokens: int, metadata: Dict) -> None:
+        self.role_prompt = {"source": source, "tokens": tokens, "metadata": metadata}
+
+    def merge(self, other: Dict) -> None:
+        """Fold in a to_dict() result, e.g. the part of a pack built by the daemon."""
+        for name, ms in other.get("stages_ms", {}).items():
+            self.add_stage(name, ms / 1000)
+        for path, nbytes in other.get("bytes_read", {}).items():
+            self.add_read(path, nbytes)
+        for cache, counts in other.get("cache", {}).items():
+            mine = self.cache.setdefault(cache, {"hits": 0, "misses": 0})
+            mine["hits"] += counts.get("hits", 0)
+            mine["misses"] += counts.get("misses", 0)
+        self.sections = self.sections or list(other.get("sections", []))
+        self.role_prompt = self.role_prompt or dict(other.get("role_prompt", {}))
+
+    def to_dict(self) -> Dict:
+        return {
+            "stages_ms": {name: round(s * 1000, 3) for name, s in self.stages.items()},
+            "total_ms": round(sum(self.stages.values()) * 1000, 3),
+            "bytes_read": dict(self.bytes_read),
+            "total_bytes_read": sum(self.bytes_read.values()),
+            "sections": [dict(r) for r in self.sections],
+            "role_prompt": dict(self.role_prompt),
+            "cache": {name: dict(counts) for name, counts in self.cache.items()},
+        }
+
+def current() -> Optional[PackStats]:
+    return _current.get()
+
+@contextmanager
+def collecting(stats: PackStats) -> Iterator[PackStats]:
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+def record_stage(name: str, started: float) -> None:
+    """Add the time since `started` (a perf_counter() reading) to stage `name`."""
+    stats = _current.get()
+    if stats is not None:
+        stats.add_stage(name, perf_counter() - started)
+
+def record_read(path: Union[Path, str], nbytes: int) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.add_read(str(path), nbytes)
+
+def record_cache(cache: str, hit: bool) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.add_cache_event(cache, hit)
+
+def record_prompt(source: str, tokens: int, metadata: Dict) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.set_role_prompt(source, tokens, metadata)
+
+def add_hook(hook: Callable[[Dict], None]) -> None:
+    """Call `hook(stats_dict)` after every pack is built in this process."""
+    _hooks.append(hook)
+
+def remove_hook(hook: Callable[[Dict], None]) -> None:
+    _hooks.remove(hook)
+
+def emit(stats: PackStats) -> None:
+    if not _hooks:
+        return
+    data = stats.to_dict()
+    for hook in list(_hooks):
+        hook(data)
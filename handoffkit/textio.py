@@ -0,0 +1,113 @@
+"""File readers that avoid loading whole documents into memory.
+
+Notes files such as docs/SESSION_NOTES.md only ever grow, but a pack needs just
+their summary block or their last few lines. These helpers read from the end of
+the file in blocks, or search it through mmap, so the Python-side cost is
+bounded by what is returned rather than by the file size.
+"""
+import mmap
+import os
+from pathlib import Path
+from typing import List, Optional, TextIO, Tuple
+
+from .docscan import SUMMARY_END, SUMMARY_START, longest_run, scan
+from .stats import record_read
+
+TAIL_BLOCK_SIZE = 64 * 1024
+
+def decode_text(data: bytes) -> str:
+    """Decode raw file bytes exactly as read_text would (including newline translation)."""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+def read_tail_lines(p: Path, max_lines: int, block_size: int = TAIL_BLOCK_SIZE) -> str:
+    """Equivalent to tail_lines(read_text(p), max_lines), reading backwards in blocks."""
+    with open(p, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        blocks = []
+        newlines = 0
+        # One extra newline guarantees the first kept line starts at a line boundary.
+        # (tail_lines keeps everything for max_lines <= 0, so read it all.)
+        while pos > 0 and (max_lines <= 0 or newlines <= max_lines):
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+    data = b"".join(reversed(blocks))
+    record_read(p, len(data))
+    if pos > 0:
+        # Drop the partial first line (this also avoids splitting a UTF-8 sequence).
+        data = data[data.index(b"\n") + 1:]
+    return scan(decode_text(data)).tail(max_lines)
+
+def read_summary_block(p: Path) -> Optional[str]:
+    """Equivalent to extract_summary_block(read_text(p)), searching the file via mmap."""
+    with open(p, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            s = mm.find(SUMMARY_START.encode("ascii"))
+            e = mm.find(SUMMARY_END.encode("ascii")) if s != -1 else -1
+            # Count what the searches scanned: up to the end marker, or the whole file.
+            record_read(p, e + len(SUMMARY_END) if e != -1 else len(mm))
+            if s == -1 or e == -1 or e <= s:
+                return None
+            return decode_text(mm[s + len(SUMMARY_START):e]).strip()
+
+STREAM_CHUNK_CHARS = 256 * 1024
+
+class RunTracker:
+    """Longest run of one character across a sequence of chunks."""
+
+    def __init__(self, ch: str) -> None:
+        self.ch = ch
+        self.longest = 0
+        self._carry = 0
+
+    def feed(self, chunk: str) -> None:
+        if not chunk:
+            return
+        lead = len(chunk) - len(chunk.lstrip(self.ch))
+        if lead == len(chunk):
+            self._carry += lead
+            self.longest = max(self.longest, self._carry)
+            return
+        self.longest = max(self.longest, self._carry + lead, longest_run(chunk, self.ch))
+        self._carry = len(chunk) - len(chunk.rstrip(self.ch))
+
+def read_capped(stream: TextIO, max_chars: Optional[int], *, chunk_chars: int = STREAM_CHUNK_CHARS) -> Tuple[str, int, bool]:
+    """Read a text stream in chunks, keeping at most `max_chars` of stripped content.
+
+    Returns (content, longest backtick run, truncated). Reading stops as soon
+    as the cap is reached, so memory is bounded by the cap, not the input.
+    """
+    parts: List[str] = []
+    kept = 0
+    ticks = RunTracker("`")
+    started = False
+    truncated = False
+    while True:
+        chunk = stream.read(chunk_chars)
+        if not chunk:
+            break
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        if max_chars is not None and kept + len(chunk) > max_chars:
+            chunk = chunk[:max_chars - kept]
+            truncated = True
+        ticks.feed(chunk)
+        parts.append(chunk)
+        kept += len(chunk)
+        if truncated:
+            break
+    content = "".join(parts).rstrip()
+    return content, ticks.longest, truncated
@@ -0,0 +1,165 @@
+"""Token counting backends.
+
+The default stays the ~4 chars/token heuristic. An offline byte-level BPE
+backend can be enabled in config with a local vocab in the tiktoken format
+(one "<base64 token bytes> <rank>" pair per line, e.g. cl100k_base.tiktoken):
+
+    "tokenizer": {"type": "bpe", "vocab_file": "tools/cl100k_base.tiktoken"}
+
+Relative vocab paths are resolved against the project root.
+"""
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# Python approximation of the cl100k pre-tokenizer (\p{L} -> [^\W\d_], \p{N} -> \d).
+# Compiled by BPETokenizer, so the default heuristic tokenizer never pays for it.
+_PRETOKENIZE = (
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)"
+    r"|(?:[^\r\n\w]|_)?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+PIECE_CACHE_LIMIT = 200_000
+COUNT_CACHE_LIMIT = 4096
+
+class Tokenizer(ABC):
+    name = "base"
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    @abstractmethod
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        """Token count of each text, in order."""
+
+    @abstractmethod
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of `text` that fits in `max_tokens` tokens."""
+
+class HeuristicTokenizer(Tokenizer):
+    """Extremely rough heuristic: ~4 chars/token typical for English."""
+
+    name = "heuristic"
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        return [max(1, len(t) // 4) for t in texts]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return text[:max(0, max_tokens) * 4]
+
+class BPETokenizer(Tokenizer):
+    """Byte-level BPE over a tiktoken-format rank file, with no third-party deps."""
+
+    def __init__(self, ranks: Dict[bytes, int], name: str = "bpe") -> None:
+        self.ranks = ranks
+        self.name = name
+        self._pieces: Dict[str, Tuple[bytes, ...]] = {}
+        self._counts: Dict[str, int] = {}
+        self._pretokenize = re.compile(_PRETOKENIZE)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "BPETokenizer":
+        import base64
+
+        ranks: Dict[bytes, int] = {}
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+        missing = [b for b in range(256) if bytes([b]) not in ranks]
+        if missing:
+            raise ValueError(f"BPE vocab {path} does not cover all single bytes ({len(missing)} missing)")
+        return cls(ranks, name=f"bpe:{path.name}")
+
+    def _merge(self, piece: str) -> Tuple[bytes, ...]:
+        cached = self._pieces.get(piece)
+        if cached is not None:
+            return cached
+        data = piece.encode("utf-8")
+        ranks = self.ranks
+        if data in ranks:
+            parts: List[bytes] = [data]
+        else:
+            parts = [data[i:i + 1] for i in range(len(data))]
+            while len(parts) > 1:
+                best = -1
+                best_rank = None
+                for i in range(len(parts) - 1):
+                    r = ranks.get(parts[i] + parts[i + 1])
+                    if r is not None and (best_rank is None or r < best_rank):
+                        best, best_rank = i, r
+                if best < 0:
+                    break
+                parts[best:best + 2] = [parts[best] + parts[best + 1]]
+        if len(self._pieces) >= PIECE_CACHE_LIMIT:
+            self._pieces.clear()
+        result = tuple(parts)
+        self._pieces[piece] = result
+        return result
+
+    def count_many(self, texts: Iterable[str]) -> List[int]:
+        # One batched pass: pre-tokenize everything, merge each distinct piece once.
+        texts = list(texts)
+        results: List[Optional[int]] = [self._counts.get(t) for t in texts]
+        pending = [i for i, r in enumerate(results) if r is None]
+        split = {i: self._pretokenize.findall(texts[i]) for i in pending}
+        piece_len: Dict[str, int] = {}
+        for pieces in split.values():
+            for piece in pieces:
+                if piece not in piece_len:
+                    piece_len[piece] = len(self._merge(piece))
+        if len(self._counts) + len(pending) > COUNT_CACHE_LIMIT:
+            self._counts.clear()
+        for i, pieces in split.items():
+            n = sum(piece_len[p] for p in pieces)
+            results[i] = n
+            self._counts[texts[i]] = n
+        return [int(r or 0) for r in results]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        used = 0
+        for m in self._pretokenize.finditer(text):
+            parts = self._merge(m.group())
+            if used + len(parts) > max_tokens:
+                keep = b"".join(parts[:max(0, max_tokens - used)])
+                return text[:m.start()] + keep.decode("utf-8", errors="ignore")
+            used += len(parts)
+        return text
+
+_loaded: Dict[Tuple[str, int], Tokenizer] = {}
+
+def load_tokenizer(spec: Union[None, str, Dict], base_dir: Path) -> Tokenizer:
+    """Build the tokenizer described by the config's "tokenizer" entry."""
+    if spec is None or spec == "heuristic":
+        return HeuristicTokenizer()
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    kind = spec.get("type", "heuristic")
+    if kind == "heuristic":
+        return HeuristicTokenizer()
+    if kind != "bpe":
+        raise ValueError(f"Unknown tokenizer type: {kind!r}")
+    vocab = spec.get("vocab_file")
+    if not vocab:
+        raise ValueError("BPE tokenizer requires 'vocab_file'")
+    p = Path(vocab)
+    if not p.is_absolute():
+        p = (base_dir / p).resolve()
+    try:
+        key = (str(p), p.stat().st_mtime_ns)
+    except OSError as e:
+        raise ValueError(f"tokenizer.vocab_file {vocab!r}: cannot read {p} ({e.strerror})")
+    tok = _loaded.get(key)
+    if tok is None:
+        tok = BPETokenizer.from_file(p)
+        _loaded[key] = tok
+    return tok
@@ -0,0 +1,62 @@
+"""The diff summary must pass awkward diffs through unchanged when nothing is cut."""
+import io
+from pathlib import Path
+
+import pytest
+
+from handoffkit.diffstage import summarize_diff
+from handoffkit.tokenizer import load_tokenizer
+
+DIFF_FIXTURES = {
+    # A "\\ No newline" line after a hunk's last counted line.
+    "no_newline_at_eof": """diff --git a/app.py b/app.py
+index 1a2b3c4..5d6e7f8 100644
+--- a/app.py
++++ b/app.py
+@@ -1,2 +1,2 @@
+ import os
+-print(os.getcwd())
+\\ No newline at end of file
++print(os.getcwd(), flush=True)
+\\ No newline at end of file
+diff --git a/lib.py b/lib.py
+--- a/lib.py
++++ b/lib.py
+@@ -1 +1 @@
+-VERSION = 1
++VERSION = 2
+""",
+    # `git diff` during a merge conflict: a combined diff, then a unified one.
+    "combined_conflict": """diff --cc app.py
+index 577191a,96a0855..0000000
+--- a/app.py
++++ b/app.py
+@@@ -1,5 -1,5 +1,9 @@@
+  import os
+++<<<<<<< HEAD
+ +MODE = "main"
+++=======
++ MODE = "other"
+++>>>>>>> other
+  print(MODE)
+  print(os.getcwd())
+ -exit(0)
+ +exit(1)
+diff --git a/lib.py b/lib.py
+index 975fbec..46b0f70 100644
+--- a/lib.py
++++ b/lib.py
+@@ -1 +1,2 @@
+ VERSION = 1
++PATCH = 0
+""",
+}
+
+@pytest.mark.parametrize("name", sorted(DIFF_FIXTURES))
+def test_unbudgeted_summary_reproduces_diff(name):
+    diff = DIFF_FIXTURES[name]
+    summary = summarize_diff(io.StringIO(diff))
+    rendered = summary.render(None, load_tokenizer({}, Path.cwd()))
+    # Drop the summary and per-file stat lines, and the blank lines between files.
+    body = [ln for ln in rendered.splitlines() if ln][1 + len(summary.files):]
+    assert body == [ln for ln in diff.splitlines() if ln]